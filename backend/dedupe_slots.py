@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Resolve duplicate confirmed bookings of the same calendar slot.
+
+    python dedupe_slots.py             # cancel every duplicate but the earliest booking of a slot
+    python dedupe_slots.py --dry-run   # only list the duplicated slots
+
+The unique_confirmed_slot index (at most one confirmed appointment per calendar, date and time)
+cannot be built while such duplicates exist, and the server refuses to start without it. They
+come from the check-then-insert booking code that predates the index. The earliest booking of a
+slot (created_at, then id) is kept, the later ones are set to "cancelled". Safe to run again.
+Uses the same MONGO_URL / DB_NAME environment as server.py.
+"""
+
+import argparse
+import asyncio
+import sys
+
+import server
+
+DUPLICATES_PIPELINE = [
+    {"$match": {"status": "confirmed"}},
+    {"$sort": {"created_at": 1, "id": 1}},
+    {"$group": {
+        "_id": {"calendar_id": "$calendar_id", "appointment_date": "$appointment_date",
+                "appointment_time": "$appointment_time"},
+        "ids": {"$push": "$id"},
+        "count": {"$sum": 1}
+    }},
+    {"$match": {"count": {"$gt": 1}}},
+]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Cancel duplicate confirmed bookings of the same slot")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the duplicated slots")
+    args = parser.parse_args()
+
+    slots = 0
+    cancelled = 0
+    touched_days = set()
+    async for group in server.db.appointments.aggregate(DUPLICATES_PIPELINE, allowDiskUse=True):
+        slot = group["_id"]
+        kept, duplicates = group["ids"][0], group["ids"][1:]
+        slots += 1
+        print(f"{'🔎' if args.dry_run else '✅'} {slot['calendar_id']} {slot['appointment_date']} "
+              f"{slot['appointment_time']}: keep {kept}, cancel {', '.join(duplicates)}")
+        if not args.dry_run:
+            result = await server.db.appointments.update_many(
+                {"id": {"$in": duplicates}, "status": "confirmed"}, {"$set": {"status": "cancelled"}}
+            )
+            cancelled += result.modified_count
+            touched_days.add((slot["calendar_id"], slot["appointment_date"]))
+
+    for calendar_id, appointment_date in touched_days:
+        await server.mark_availability_changed(calendar_id, appointment_date)
+
+    if args.dry_run:
+        print(f"{slots} duplicated slots")
+    else:
+        print(f"{slots} duplicated slots, {cancelled} appointments cancelled")
+        await server.ensure_indexes()
+        print("✅ unique_confirmed_slot index is in place")
+
+    server.client.close()
+    return 1 if args.dry_run and slots else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+One-off migration of datetime fields stored as ISO strings to native BSON dates.
+
+    python migrate_datetimes.py             # convert every collection in server.MONGO_DATETIME_FIELDS
+    python migrate_datetimes.py --dry-run   # only count the documents that still hold strings
+
+Run it once before deploying the server version that stores native dates: range queries such as
+subscription_expires >= now do not match string values. Safe to run again, converted fields are
+no longer strings. Uses the same MONGO_URL / DB_NAME environment as server.py.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+import server
+
+BATCH_SIZE = 500
+
+
+def parse_iso_datetime(value):
+    """Datetime of a legacy ISO string, naive values are taken as UTC"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+async def migrate_field(collection_name, field, dry_run):
+    """Convert one field of a collection, return (converted, unparseable) counts"""
+    collection = server.db[collection_name]
+    query = {field: {"$type": "string"}}
+    if dry_run:
+        return await collection.count_documents(query), 0
+
+    converted = 0
+    invalid = 0
+    operations = []
+    async for doc in collection.find(query, {"_id": 1, field: 1}).batch_size(BATCH_SIZE):
+        try:
+            value = parse_iso_datetime(doc[field])
+        except ValueError:
+            invalid += 1
+            continue
+        operations.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: value}}))
+        if len(operations) >= BATCH_SIZE:
+            converted += (await collection.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+    if operations:
+        converted += (await collection.bulk_write(operations, ordered=False)).modified_count
+    return converted, invalid
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Convert ISO string datetimes to native BSON dates")
+    parser.add_argument("--dry-run", action="store_true", help="Only count documents that need converting")
+    args = parser.parse_args()
+
+    invalid_total = 0
+    for collection_name, fields in server.MONGO_DATETIME_FIELDS.items():
+        for field in fields:
+            converted, invalid = await migrate_field(collection_name, field, args.dry_run)
+            invalid_total += invalid
+            action = "to convert" if args.dry_run else "converted"
+            print(f"{'⚠️ ' if invalid else '✅'} {collection_name}.{field}: {converted} {action}"
+                  f"{f', {invalid} unparseable left as strings' if invalid else ''}")
+
+    server.client.close()
+    return 1 if invalid_total else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
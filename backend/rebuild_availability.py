@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Rebuild the materialized availability collection from settings and appointments.
+
+    python rebuild_availability.py                 # every active calendar, stored window (90 days)
+    python rebuild_availability.py <calendar_id>   # only the given calendars
+    python rebuild_availability.py --check         # report stale documents without writing
+
+Uses the same MONGO_URL / DB_NAME environment as server.py.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import date, timedelta
+
+import server
+
+COMPARED_FIELDS = ("blocked", "slots", "free")
+
+
+async def check_calendar(calendar_id, schedule, start_date, end_date):
+    """Compare the stored documents with freshly computed ones, return the stale dates"""
+    stored = {}
+    async for doc in server.db.availability.find(
+        {"calendar_id": calendar_id, "date": {"$gte": start_date.isoformat(), "$lte": end_date.isoformat()}},
+        {"_id": 0}
+    ):
+        stored[doc["date"]] = doc
+
+    booked = await server.fetch_booked_intervals(calendar_id, schedule.appointment_duration,
+                                                 start_date.isoformat(), end_date.isoformat())
+    stale = []
+    current_date = start_date
+    while current_date <= end_date:
+        date_string = current_date.isoformat()
+        expected = server.build_availability_doc(calendar_id, schedule, current_date, booked.get(date_string, server.NO_BOOKINGS))
+        doc = stored.get(date_string)
+        # Stale documents (appointments changed since the build) are rebuilt on read, not reported
+        if doc and not doc.get("stale") and (any(doc[field] != expected[field] for field in COMPARED_FIELDS)
+                                             or doc.get("settings_revision", 0) != expected["settings_revision"]):
+            stale.append(date_string)
+        current_date += timedelta(days=1)
+    return stale
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild materialized calendar availability")
+    parser.add_argument("calendar_ids", nargs="*", help="Calendars to rebuild (default: every active calendar)")
+    parser.add_argument("--days", type=int, default=server.AVAILABILITY_WINDOW_DAYS,
+                        help="Number of days from today to rebuild (default: the stored window)")
+    parser.add_argument("--check", action="store_true", help="Only report stale documents")
+    args = parser.parse_args()
+
+    start_date = date.today()
+    end_date = start_date + timedelta(days=args.days - 1)
+    calendar_ids = args.calendar_ids or [
+        cal["id"] async for cal in server.db.calendars.find({"is_active": True}, {"_id": 0, "id": 1})
+    ]
+
+    stale_total = 0
+    for calendar_id in calendar_ids:
+        schedule = await server.load_calendar_settings(calendar_id)
+        if not schedule:
+            print(f"⚠️  {calendar_id}: no settings, skipped")
+            continue
+
+        if args.check:
+            stale = await check_calendar(calendar_id, schedule, start_date, end_date)
+            stale_total += len(stale)
+            print(f"{'❌' if stale else '✅'} {calendar_id}: {len(stale)} stale days {stale if stale else ''}")
+        else:
+            # Documents are marked stale instead of deleted: a deletion would reset the change
+            # counters that keep concurrent server rebuilds from storing outdated bitmaps
+            await server.invalidate_availability(calendar_id)
+            await server.materialize_availability(calendar_id, schedule, start_date, end_date)
+            # Days that left the window are no longer read through the collection
+            window_end = start_date + timedelta(days=server.AVAILABILITY_WINDOW_DAYS)
+            await server.db.availability.delete_many({
+                "calendar_id": calendar_id,
+                "$or": [{"date": {"$lt": start_date.isoformat()}}, {"date": {"$gte": window_end.isoformat()}}]
+            })
+            print(f"✅ {calendar_id}: rebuilt {args.days} days")
+
+    server.client.close()
+    return 1 if stale_total else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
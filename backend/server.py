@@ -1,8 +1,12 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, TEXT, ReturnDocument, ReplaceOne
+from pymongo.errors import PyMongoError, DuplicateKeyError, BulkWriteError, OperationFailure
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone, date
@@ -10,16 +14,31 @@ import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Set
+from dataclasses import dataclass
 import uuid
 import json
+import re
+import base64
+import bisect
+import csv
+import hashlib
+import heapq
+import itertools
+import io
+import asyncio
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Datetimes are stored as native BSON dates and read back as aware UTC datetimes
+client = AsyncIOMotorClient(mongo_url, tz_aware=True, tzinfo=timezone.utc)
 db = client[os.environ['DB_NAME']]
 
 # Security
@@ -28,6 +47,74 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Calendar settings cache (shared through Redis when SETTINGS_CACHE_REDIS_URL is set)
+SETTINGS_CACHE_TTL_SECONDS = int(os.environ.get("SETTINGS_CACHE_TTL_SECONDS", "300"))
+SETTINGS_CACHE_MAX_SIZE = int(os.environ.get("SETTINGS_CACHE_MAX_SIZE", "5000"))
+SETTINGS_CACHE_REDIS_URL = os.environ.get("SETTINGS_CACHE_REDIS_URL")
+
+# Serve slots and month views from the materialized availability collection
+AVAILABILITY_MATERIALIZED = int(os.environ.get("AVAILABILITY_MATERIALIZED", "0"))
+# Only days from today to today + AVAILABILITY_WINDOW_DAYS - 1 are stored, others are computed per request
+AVAILABILITY_WINDOW_DAYS = int(os.environ.get("AVAILABILITY_WINDOW_DAYS", "90"))
+
+# bcrypt runs on a bounded thread pool; beyond the queue limit requests get a 429
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+# Embed the user profile in signed claims so get_current_user does not query Mongo.
+# Such tokens cannot be revoked and keep their profile snapshot until they expire
+JWT_STATELESS_CLAIMS = int(os.environ.get("JWT_STATELESS_CLAIMS", "0"))
+
+# Startup self-check that reports route queries not served by an index
+INDEX_SELF_CHECK = int(os.environ.get("INDEX_SELF_CHECK", "0"))
+
+# Pagination
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Bulk appointment endpoints
+# require_all: every item is validated first and nothing is written if one fails. Not a
+# transaction: booked slots lost to a concurrent request are undone by a compensating delete,
+# so until then other requests see (and may be refused) the slots that end up rolled back.
+# best_effort: write whatever passes.
+MAX_BULK_APPOINTMENTS = 100
+MAX_RECURRENCE_INTERVAL_DAYS = 365
+BULK_MODES = ("require_all", "best_effort")
+
+# Multi-day slot ranges (week views)
+MAX_SLOTS_RANGE_DAYS = 31
+
+# Earliest available slot search
+NEXT_AVAILABLE_DEFAULT_DAYS = 60
+NEXT_AVAILABLE_MAX_DAYS = 365
+NEXT_AVAILABLE_WINDOW_DAYS = 7  # Appointments are fetched one week-sized window at a time
+
+# Cross-calendar availability search
+AVAILABILITY_SEARCH_DEFAULT_DAYS = 3
+AVAILABILITY_SEARCH_MAX_DAYS = 14
+AVAILABILITY_SEARCH_DEFAULT_LIMIT = 20
+AVAILABILITY_SEARCH_MAX_LIMIT = 100
+AVAILABILITY_SEARCH_MAX_CALENDARS = 500  # Beyond it the first ones by (created_at, id) are searched, see X-Calendars-Truncated
+AVAILABILITY_SEARCH_BATCH_SIZE = 50  # Calendars per batched settings/appointments query
+AVAILABILITY_SEARCH_CONCURRENCY = 4  # Batches queried at the same time
+
+# Calendar autocomplete
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+# Full reload from Mongo, picks up calendars created by other workers
+AUTOCOMPLETE_REFRESH_SECONDS = int(os.environ.get("AUTOCOMPLETE_REFRESH_SECONDS", "300"))
+
+# Locations catalogue, served from memory with a strong ETag
+LOCATIONS_PATH = ROOT_DIR.parent / "frontend" / "src" / "data" / "locations.json"
+LOCATIONS_CACHE_CONTROL = "public, max-age=300"
+
+# Streaming appointment export
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "500"))
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Authenticated user cache. No route updates or deletes users; code that starts doing so must
+# call user_cache.invalidate(user_id), other workers still see the old user until the TTL
+USER_CACHE_TTL_SECONDS = int(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.environ.get("USER_CACHE_MAX_SIZE", "10000"))
 
 # Free license settings
 LICENCE_FREE = int(os.environ.get("LICENCE_FREE", "1"))
@@ -106,6 +193,8 @@ class CalendarCreate(BaseModel):
     url_slug: str
     category: str = "general"
 
+DEFAULT_APPOINTMENT_DURATION = 60
+
 class CalendarSettings(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     calendar_id: str
@@ -114,8 +203,9 @@ class CalendarSettings(BaseModel):
     blocked_dates: List[str] = []  # ISO date strings
     blocked_saturdays: bool = False
     blocked_sundays: bool = False
-    appointment_duration: int = 60  # minutes
+    appointment_duration: int = DEFAULT_APPOINTMENT_DURATION  # minutes
     buffer_time: int = 0  # minutes between appointments
+    revision: int = 0  # bumped on every update, materialized availability records the one it was built from
 
 class CalendarSettingsCreate(BaseModel):
     working_hours: List[WorkingHours] = []
@@ -123,9 +213,11 @@ class CalendarSettingsCreate(BaseModel):
     blocked_dates: List[str] = []
     blocked_saturdays: bool = False
     blocked_sundays: bool = False
-    appointment_duration: int = 60
+    appointment_duration: int = DEFAULT_APPOINTMENT_DURATION
     buffer_time: int = 0
 
+APPOINTMENT_STATUSES = ("confirmed", "cancelled", "completed")
+
 class Appointment(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     calendar_id: str
@@ -136,6 +228,7 @@ class Appointment(BaseModel):
     appointment_time: str  # HH:MM format
     status: str = "confirmed"  # "confirmed", "cancelled", "completed"
     notes: str = ""
+    duration: Optional[int] = None  # Minutes, from the settings at booking time (missing on older appointments)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class AppointmentCreate(BaseModel):
@@ -143,6 +236,26 @@ class AppointmentCreate(BaseModel):
     appointment_time: str
     notes: str = ""
 
+class AppointmentSlot(BaseModel):
+    appointment_date: str
+    appointment_time: str
+
+class RecurrenceRule(BaseModel):
+    start_date: str  # ISO date of the first session
+    appointment_time: str
+    interval_days: int = Field(7, ge=1, le=MAX_RECURRENCE_INTERVAL_DAYS)  # Weekly by default
+    count: int = Field(..., ge=1, le=MAX_BULK_APPOINTMENTS)
+
+class BulkAppointmentCreate(BaseModel):
+    appointments: List[AppointmentSlot] = Field([], max_length=MAX_BULK_APPOINTMENTS)
+    recurrence: Optional[RecurrenceRule] = None
+    notes: str = ""
+    mode: str = "require_all"  # "require_all" or "best_effort", see BULK_MODES
+
+class BulkAppointmentDelete(BaseModel):
+    appointment_ids: List[str] = Field(..., max_length=MAX_BULK_APPOINTMENTS)
+    mode: str = "require_all"
+
 class Subscription(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     calendar_id: str
@@ -165,10 +278,87 @@ class Friendship(BaseModel):
 class FriendshipRequest(BaseModel):
     employer_id: str
 
+class FriendshipStatusesRequest(BaseModel):
+    employer_ids: List[str] = Field(..., max_length=MAX_PAGE_SIZE)
+
+class CalendarListItem(Calendar):
+    friendship_status: Optional[Dict[str, Any]] = None  # Only with include_friendship_status
+
 class MercadoPagoSettings(BaseModel):
     access_token: str
     public_key: str
 
+# In-process caches
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire ttl seconds after being set"""
+    
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key, value):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+user_cache = TTLCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
+
+# Caches reported by /metrics
+CACHES: Dict[str, TTLCache] = {"users": user_cache}
+
+def user_claims(user: dict) -> dict:
+    """Profile claims embedded in the token when JWT_STATELESS_CLAIMS is enabled"""
+    created_at = user.get("created_at")
+    return {
+        "email": user["email"],
+        "full_name": user["full_name"],
+        "user_type": user["user_type"],
+        "location": user["location"],
+        "is_active": user.get("is_active", True),
+        "created_at": created_at.isoformat() if isinstance(created_at, datetime) else created_at
+    }
+
 # Helper functions
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -176,6 +366,31 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+password_pool_stats = {"pending": 0, "completed": 0, "rejected": 0}
+
+async def run_password_job(func, *args):
+    """Run a bcrypt call off the event loop, rejecting with 429 when the queue is full"""
+    if password_pool_stats["pending"] >= PASSWORD_HASH_QUEUE_LIMIT:
+        password_pool_stats["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many authentication requests, please retry",
+            headers={"Retry-After": "1"}
+        )
+    password_pool_stats["pending"] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_executor, func, *args)
+    finally:
+        password_pool_stats["pending"] -= 1
+        password_pool_stats["completed"] += 1
+
+async def async_verify_password(plain_password, hashed_password):
+    return await run_password_job(verify_password, plain_password, hashed_password)
+
+async def async_get_password_hash(password):
+    return await run_password_job(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -200,33 +415,48 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
     
-    user = await db.users.find_one({"id": user_id})
+    # Stateless mode: the signed claims are the user. There is no revocation, a token and
+    # its profile snapshot stay valid until they expire (ACCESS_TOKEN_EXPIRE_MINUTES)
+    if JWT_STATELESS_CLAIMS and "user_type" in payload:
+        return User(
+            id=user_id,
+            email=payload["email"],
+            full_name=payload["full_name"],
+            user_type=payload["user_type"],
+            location=payload["location"],
+            is_active=payload.get("is_active", True),
+            created_at=payload.get("created_at")
+        )
+    
+    user = user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
-    return User(**user)
-
-def prepare_for_mongo(data):
-    """Convert datetime objects to ISO strings for MongoDB storage"""
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat()
-            elif isinstance(value, dict):
-                data[key] = prepare_for_mongo(value)
-            elif isinstance(value, list):
-                data[key] = [prepare_for_mongo(item) if isinstance(item, dict) else item for item in value]
-    return data
-
-def parse_from_mongo(item):
-    """Parse datetime strings back from MongoDB"""
-    if isinstance(item, dict):
-        for key, value in item.items():
-            if isinstance(value, str) and key.endswith(('_at', 'expires', 'starts')):
-                try:
-                    item[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                except:
-                    pass
-    return item
+        user_doc = await db.users.find_one({"id": user_id})
+        if user_doc is None:
+            raise credentials_exception
+        user = User(**user_doc)
+        user_cache.set(user_id, user)
+    return user
+
+# MongoDB codec
+# Models are stored as-is: the BSON encoder writes datetimes as native dates and the tz_aware
+# client reads them back as UTC datetimes, so no per-document conversion walk is needed.
+# Datetime fields per collection, converted from legacy ISO strings by migrate_datetimes.py
+MONGO_DATETIME_FIELDS = {
+    "users": ("created_at",),
+    "calendars": ("created_at", "subscription_expires"),
+    "appointments": ("created_at",),
+    "subscriptions": ("starts_at", "expires_at", "created_at"),
+    "friendships": ("requested_at", "responded_at"),
+    "availability": ("updated_at",),
+}
+
+def to_mongo(model: BaseModel) -> dict:
+    """Document for a model, datetimes are kept for the BSON encoder"""
+    return model.dict()
+
+def from_mongo(model_class, document: dict):
+    """Model for a stored document (the Mongo _id is ignored by the model)"""
+    return model_class(**document)
 
 def create_free_subscription(employer_id: str, calendar_id: str):
     """Create a free subscription for new employers"""
@@ -244,9 +474,1119 @@ def create_free_subscription(employer_id: str, calendar_id: str):
         )
     return None
 
+def parse_date_param(value: Optional[str], name: str) -> Optional[str]:
+    """Validate an optional ISO date query parameter"""
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} date format")
+
+def date_range_filter(date_from: Optional[str], date_to: Optional[str]) -> Optional[dict]:
+    """Build an inclusive appointment_date range condition"""
+    condition = {}
+    if date_from:
+        condition["$gte"] = date_from
+    if date_to:
+        condition["$lte"] = date_to
+    return condition or None
+
+# Cursor pagination
+CURSOR_VALUE_TYPES = (str, int, float, datetime)
+
+def _cursor_default(value):
+    # Datetime sort keys are tagged so they decode back to datetimes and compare as such in Mongo
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Unsupported cursor value: {type(value).__name__}")
+
+def _cursor_object_hook(obj: dict):
+    if set(obj) == {"$date"}:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+def encode_cursor(values: List[Any]) -> str:
+    """Opaque cursor holding the sort key values of the last returned item"""
+    return base64.urlsafe_b64encode(json.dumps(values, default=_cursor_default).encode()).decode()
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()), object_hook=_cursor_object_hook)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Values go straight into query filters: scalars only, so a crafted cursor cannot inject operators
+    if not isinstance(values, list) or not all(
+        value is None or (isinstance(value, CURSOR_VALUE_TYPES) and not isinstance(value, bool))
+        for value in values
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def keyset_filter(sort_fields: List[str], values: List[Any]) -> dict:
+    """Filter matching the items strictly after the cursor for an ascending sort"""
+    if len(values) != len(sort_fields):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    clauses = []
+    for i, field in enumerate(sort_fields):
+        clause = {sort_fields[j]: values[j] for j in range(i)}
+        # Null and missing keys sort first, and {"$gt": None} would match nothing after them
+        clause[field] = {"$ne": None} if values[i] is None else {"$gt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+async def fetch_page(collection, query: dict, sort_fields: List[str], response: Response,
+                     cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> List[dict]:
+    """Fetch one keyset page sorted by sort_fields, setting X-Next-Cursor when more items remain"""
+    if cursor:
+        query = {"$and": [query, keyset_filter(sort_fields, decode_cursor(cursor))]}
+    
+    items = await collection.find(query).sort(
+        [(field, ASCENDING) for field in sort_fields]
+    ).limit(limit + 1).to_list(limit + 1)
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor([items[-1].get(field) for field in sort_fields])
+    return items
+
+# Calendar search
+CALENDAR_SEARCH_FIELDS = ("calendar_name", "business_name", "description")
+
+def calendar_regex_filter(search: str) -> dict:
+    """Case-insensitive substring match with the user input escaped, so it is always a literal"""
+    search_regex = {"$regex": re.escape(search), "$options": "i"}
+    return {"$or": [{field: search_regex} for field in CALENDAR_SEARCH_FIELDS]}
+
+async def fetch_ranked_page(collection, query: dict, response: Response,
+                            cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> List[dict]:
+    """Fetch one page of a $text query ranked by relevance, setting X-Next-Cursor when more items remain.
+    
+    Scores are not stable sort keys, so the cursor holds the offset of the next page.
+    """
+    offset = 0
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        offset = values[0]
+    
+    score = {"$meta": "textScore"}
+    items = await collection.find(query, {"score": score}).sort(
+        [("score", score), ("id", ASCENDING)]
+    ).skip(offset).limit(limit + 1).to_list(limit + 1)
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor([offset + limit])
+    for item in items:
+        item.pop("score", None)
+    return items
+
+async def search_calendars(query: dict, search: str, response: Response,
+                           cursor: Optional[str], limit: int) -> List[dict]:
+    """Calendars matching the search text, ranked by the weighted calendar_search text index"""
+    try:
+        return await fetch_ranked_page(db.calendars, {**query, "$text": {"$search": search}}, response, cursor, limit)
+    except OperationFailure as e:
+        # Text index missing (e.g. it failed to build at startup): fall back to an escaped substring match
+        logging.getLogger(__name__).warning(f"Calendar text search unavailable, using regex fallback: {e}")
+        return await fetch_page(db.calendars, {**query, **calendar_regex_filter(search)},
+                                ["created_at", "id"], response, cursor, limit)
+
+# Calendar autocomplete
+def fold_text(text: Optional[str]) -> str:
+    """Lowercase, strip accents and collapse whitespace: 'Clínica  Pérez' -> 'clinica perez'"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).casefold().split())
+
+def name_prefix_keys(name: Optional[str]) -> set:
+    """Every word-start suffix of the folded name, so 'perez' also matches 'Clinica Perez'"""
+    words = fold_text(name).split()
+    return {" ".join(words[i:]) for i in range(len(words))}
+
+class CalendarPrefixIndex:
+    """In-memory typeahead over calendar and business names.
+    
+    Each (province, city) partition is a sorted list of (folded key, calendar_id) searched with
+    bisect; partitions of a province are merged lazily with heapq.merge so results stay in key order.
+    """
+    
+    def __init__(self):
+        self.partitions: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        self.calendars: Dict[str, dict] = {}
+        self.built_at: Optional[float] = None
+        self.refresh_task: Optional[asyncio.Task] = None
+    
+    @staticmethod
+    def _entry(calendar: dict) -> dict:
+        location = calendar.get("location") or {}
+        expires = calendar.get("subscription_expires")
+        return {
+            "id": calendar["id"],
+            "calendar_name": calendar.get("calendar_name", ""),
+            "business_name": calendar.get("business_name", ""),
+            "url_slug": calendar.get("url_slug", ""),
+            "category": calendar.get("category", "general"),
+            "subscription_expires": expires if isinstance(expires, datetime) else None,
+            "partition": (fold_text(location.get("province")), fold_text(location.get("city")))
+        }
+    
+    @staticmethod
+    def _keys(calendar: dict) -> set:
+        return name_prefix_keys(calendar.get("calendar_name")) | name_prefix_keys(calendar.get("business_name"))
+    
+    def rebuild(self, calendars: List[dict]):
+        partitions: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        entries = {}
+        for calendar in calendars:
+            entry = self._entry(calendar)
+            entries[entry["id"]] = entry
+            partitions.setdefault(entry["partition"], []).extend((key, entry["id"]) for key in self._keys(calendar))
+        for keys in partitions.values():
+            keys.sort()
+        self.partitions, self.calendars = partitions, entries
+        self.built_at = time.monotonic()
+    
+    def add(self, calendar: dict):
+        """Incremental update for a single new or changed calendar"""
+        self.remove(calendar["id"])
+        entry = self._entry(calendar)
+        self.calendars[entry["id"]] = entry
+        keys = self.partitions.setdefault(entry["partition"], [])
+        for key in self._keys(calendar):
+            bisect.insort(keys, (key, entry["id"]))
+    
+    def remove(self, calendar_id: str):
+        entry = self.calendars.pop(calendar_id, None)
+        if entry:
+            keys = self.partitions.get(entry["partition"], [])
+            keys[:] = [item for item in keys if item[1] != calendar_id]
+    
+    def _matches(self, keys: List[Tuple[str, str]], prefix: str):
+        index = bisect.bisect_left(keys, (prefix,))
+        while index < len(keys) and keys[index][0].startswith(prefix):
+            yield keys[index]
+            index += 1
+    
+    def search(self, prefix: str, province: Optional[str] = None, city: Optional[str] = None,
+               category: Optional[str] = None, limit: int = AUTOCOMPLETE_DEFAULT_LIMIT) -> List[dict]:
+        """Top matches by folded name among calendars with an active subscription"""
+        prefix = fold_text(prefix)
+        if not prefix:
+            return []
+        province, city = fold_text(province), fold_text(city)
+        partitions = [
+            keys for (part_province, part_city), keys in self.partitions.items()
+            if (not province or part_province == province) and (not city or part_city == city)
+        ]
+        
+        now = datetime.now(timezone.utc)
+        results, seen = [], set()
+        for _, calendar_id in heapq.merge(*(self._matches(keys, prefix) for keys in partitions)):
+            entry = self.calendars.get(calendar_id)
+            if calendar_id in seen or not entry:
+                continue
+            if not entry["subscription_expires"] or entry["subscription_expires"] < now:
+                continue
+            if category and entry["category"] != category:
+                continue
+            seen.add(calendar_id)
+            results.append(entry)
+            if len(results) >= limit:
+                break
+        return results
+    
+    def is_stale(self) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > AUTOCOMPLETE_REFRESH_SECONDS
+
+calendar_autocomplete = CalendarPrefixIndex()
+
+async def refresh_calendar_autocomplete():
+    """Reload the prefix index with every active calendar"""
+    projection = {"_id": 0, "id": 1, "calendar_name": 1, "business_name": 1, "url_slug": 1,
+                  "category": 1, "location": 1, "subscription_expires": 1}
+    calendars = await db.calendars.find({"is_active": True}, projection).to_list(None)
+    calendar_autocomplete.rebuild(calendars)
+
+def schedule_autocomplete_refresh():
+    """Refresh a stale index in the background, the current request is served from memory"""
+    task = calendar_autocomplete.refresh_task
+    if calendar_autocomplete.is_stale() and (task is None or task.done()):
+        calendar_autocomplete.refresh_task = asyncio.create_task(refresh_calendar_autocomplete())
+
+# Locations
+@dataclass(frozen=True)
+class LocationsPayload:
+    body: bytes
+    etag: str
+    mtime: Optional[float]
+
+LOCATIONS_FALLBACK = {"argentina": {"name": "Argentina", "provinces": {}}}
+locations_payload: Optional[LocationsPayload] = None
+
+def load_locations() -> LocationsPayload:
+    """Read and pre-serialize locations.json, keyed by its mtime"""
+    try:
+        mtime = LOCATIONS_PATH.stat().st_mtime
+        with open(LOCATIONS_PATH, 'r', encoding='utf-8') as f:
+            locations = json.load(f)
+    except FileNotFoundError:
+        mtime, locations = None, LOCATIONS_FALLBACK
+    body = json.dumps(locations, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return LocationsPayload(body=body, etag=f'"{hashlib.sha256(body).hexdigest()}"', mtime=mtime)
+
+def current_locations() -> LocationsPayload:
+    """Cached payload, reloaded when the file's mtime changes"""
+    global locations_payload
+    try:
+        mtime = LOCATIONS_PATH.stat().st_mtime
+    except FileNotFoundError:
+        mtime = None
+    if locations_payload is None or locations_payload.mtime != mtime:
+        locations_payload = load_locations()
+    return locations_payload
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+# Appointment export
+EXPORT_FIELDS = ("id", "calendar_id", "client_id", "client_name", "client_email", "appointment_date",
+                 "appointment_time", "status", "notes", "duration", "created_at")
+
+# Spreadsheets run cells starting with these as formulas (CSV injection)
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def csv_cell(value):
+    """Quote client-typed text that a spreadsheet would evaluate, with a leading apostrophe"""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+async def stream_appointments_export(query: dict, export_format: str):
+    """Yield the matching appointments as NDJSON or CSV, one chunk per EXPORT_BATCH_SIZE rows.
+    
+    The Motor cursor is consumed batch by batch, so memory stays flat regardless of history size.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if export_format == "csv" else None
+    if writer:
+        writer.writerow(EXPORT_FIELDS)
+    
+    projection = {"_id": 0, **{field: 1 for field in EXPORT_FIELDS}}
+    cursor = db.appointments.find(query, projection).sort(
+        [("appointment_date", ASCENDING), ("appointment_time", ASCENDING), ("id", ASCENDING)]
+    ).batch_size(EXPORT_BATCH_SIZE)
+    
+    rows = 0
+    async for apt in cursor:
+        values = [export_value(apt.get(field)) for field in EXPORT_FIELDS]
+        if writer:
+            writer.writerow([csv_cell(value) for value in values])
+        else:
+            buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, values)), ensure_ascii=False) + "\n")
+        rows += 1
+        if rows % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+# Batched loaders
+class DocumentLoader:
+    """DataLoader-style batching: every load() issued in the same event loop tick
+    is resolved by a single $in query on key_field, results are cached per key."""
+    
+    def __init__(self, collection, key_field: str = "id", projection: Optional[dict] = None):
+        self.collection = collection
+        self.key_field = key_field
+        self.projection = {"_id": 0, **(projection or {})}
+        self._futures: Dict[Any, asyncio.Future] = {}
+        self._pending: List[Any] = []
+        # The event loop only keeps weak references to tasks, hold the in-flight dispatches here
+        self._dispatch_tasks: Set[asyncio.Task] = set()
+    
+    def load(self, key) -> "asyncio.Future":
+        if key in self._futures:
+            return self._futures[key]
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if key is None:
+            future.set_result(None)
+            return future
+        self._futures[key] = future
+        self._pending.append(key)
+        if len(self._pending) == 1:
+            loop.call_soon(self._schedule_dispatch)
+        return future
+    
+    def _schedule_dispatch(self):
+        task = asyncio.get_running_loop().create_task(self._dispatch())
+        self._dispatch_tasks.add(task)
+        task.add_done_callback(self._dispatch_tasks.discard)
+    
+    async def load_many(self, keys: List[Any]) -> List[Optional[dict]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+    
+    async def _dispatch(self):
+        keys, self._pending = self._pending, []
+        try:
+            docs = await self.collection.find({self.key_field: {"$in": keys}}, self.projection).to_list(None)
+        except Exception as e:
+            for key in keys:
+                self._futures[key].set_exception(e)
+            return
+        
+        # Keep the first match per key, like find_one would
+        by_key = {}
+        for doc in docs:
+            by_key.setdefault(doc[self.key_field], doc)
+        for key in keys:
+            self._futures[key].set_result(by_key.get(key))
+
+class Loaders:
+    """Per-request loaders for enrichment code"""
+    
+    def __init__(self):
+        self.users = DocumentLoader(db.users, projection={"password": 0})
+        self.calendars = DocumentLoader(db.calendars)
+        self.calendars_by_employer = DocumentLoader(db.calendars, key_field="employer_id")
+        self.appointments = DocumentLoader(db.appointments)
+
+def get_loaders() -> Loaders:
+    return Loaders()
+
+# Appointment helpers
+def can_delete_appointment(user: User, appointment: dict, calendar: dict) -> bool:
+    """Only the client who made the appointment or the employer can delete it"""
+    return not ((user.user_type == "client" and appointment["client_id"] != user.id) or
+                (user.user_type == "employer" and calendar["employer_id"] != user.id))
+
+def expand_bulk_slots(request_data: BulkAppointmentCreate) -> List[AppointmentSlot]:
+    """Explicit slots followed by the sessions generated by the recurrence rule"""
+    slots = list(request_data.appointments)
+    recurrence = request_data.recurrence
+    if recurrence:
+        try:
+            first_date = date.fromisoformat(recurrence.start_date)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid recurrence start_date format")
+        try:
+            slots.extend(
+                AppointmentSlot(
+                    appointment_date=(first_date + timedelta(days=recurrence.interval_days * i)).isoformat(),
+                    appointment_time=recurrence.appointment_time
+                )
+                for i in range(recurrence.count)
+            )
+        except OverflowError:
+            raise HTTPException(status_code=400, detail="Recurrence goes past the supported date range")
+    return slots
+
+# Friendship helpers
+def friendship_status_info(friendship: Optional[dict]) -> dict:
+    """Status payload returned to a client for one employer"""
+    if not friendship:
+        return {"status": "none", "can_request": True}
+    
+    return {
+        "status": friendship["status"],
+        "can_request": friendship["status"] in ["blocked"],
+        "friendship_id": friendship["id"]
+    }
+
+async def fetch_friendship_statuses(client_id: str, employer_ids: List[str]) -> Dict[str, dict]:
+    """Friendship status of a client with many employers in one $in query"""
+    friendships = {}
+    async for friendship in db.friendships.find(
+        {"client_id": client_id, "employer_id": {"$in": list(set(employer_ids))}},
+        {"_id": 0, "id": 1, "employer_id": 1, "status": 1}
+    ):
+        friendships.setdefault(friendship["employer_id"], friendship)
+    return {employer_id: friendship_status_info(friendships.get(employer_id)) for employer_id in employer_ids}
+
+# Compiled schedule
+# Stored as settings["compiled_schedule"] on save so slot generation is integer arithmetic
+SCHEDULE_VERSION = 1
+
+def parse_minutes(value: str) -> int:
+    """Minutes since midnight of an HH:MM string"""
+    parsed = datetime.strptime(value, "%H:%M")
+    return parsed.hour * 60 + parsed.minute
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def compile_time_ranges(time_ranges: List[dict]) -> List[List[int]]:
+    return [[parse_minutes(tr["start_time"]), parse_minutes(tr["end_time"])] for tr in time_ranges]
+
+def compile_schedule(settings: dict) -> dict:
+    """Compile raw settings into per-weekday minute ranges, date overrides and blocked sets.
+    
+    Raises ValueError on malformed times.
+    """
+    # The first entry of a weekday or date wins, as in the stored lists
+    weekly: List[Optional[List[List[int]]]] = [None] * 7
+    for hours in settings.get("working_hours", []):
+        day_of_week = hours["day_of_week"]
+        if 0 <= day_of_week <= 6 and weekly[day_of_week] is None:
+            weekly[day_of_week] = compile_time_ranges(hours.get("time_ranges", []))
+    
+    # Specific dates without ranges fall back to the weekly hours, so they are not kept
+    overrides = {}
+    seen_dates = set()
+    for spec_date in settings.get("specific_date_hours", []):
+        if spec_date["date"] not in seen_dates:
+            seen_dates.add(spec_date["date"])
+            if spec_date["time_ranges"]:
+                overrides[spec_date["date"]] = compile_time_ranges(spec_date["time_ranges"])
+    
+    blocked_weekdays = []
+    if settings.get("blocked_saturdays", False):
+        blocked_weekdays.append(5)
+    if settings.get("blocked_sundays", False):
+        blocked_weekdays.append(6)
+    
+    return {
+        "version": SCHEDULE_VERSION,
+        "weekly": [ranges or [] for ranges in weekly],
+        "overrides": overrides,
+        "blocked_dates": sorted(set(settings.get("blocked_dates", []))),
+        "blocked_weekdays": blocked_weekdays,
+        "appointment_duration": settings.get("appointment_duration", 60),
+        "buffer_time": settings.get("buffer_time", 0)
+    }
+
+@dataclass
+class CompiledSchedule:
+    """In-memory form of a compiled schedule, next to the raw settings it came from"""
+    raw: dict
+    weekly: Tuple[Tuple[Tuple[int, int], ...], ...]
+    overrides: Dict[str, Tuple[Tuple[int, int], ...]]
+    blocked_dates: frozenset
+    blocked_weekdays: frozenset
+    appointment_duration: int
+    buffer_time: int
+    revision: int = 0
+
+def load_schedule(settings: dict) -> CompiledSchedule:
+    """Build the schedule from the stored compiled form, compiling legacy documents on the fly"""
+    compiled = settings.get("compiled_schedule")
+    if not compiled or compiled.get("version") != SCHEDULE_VERSION:
+        compiled = compile_schedule(settings)
+    
+    return CompiledSchedule(
+        raw={key: value for key, value in settings.items() if key not in ("_id", "compiled_schedule")},
+        weekly=tuple(tuple((start, end) for start, end in ranges) for ranges in compiled["weekly"]),
+        overrides={
+            date_string: tuple((start, end) for start, end in ranges)
+            for date_string, ranges in compiled["overrides"].items()
+        },
+        blocked_dates=frozenset(compiled["blocked_dates"]),
+        blocked_weekdays=frozenset(compiled["blocked_weekdays"]),
+        appointment_duration=compiled["appointment_duration"],
+        buffer_time=compiled["buffer_time"],
+        revision=settings.get("revision", 0)
+    )
+
+# Calendar settings cache
+class RedisSettingsStore:
+    """Settings documents shared by every worker through a Redis-compatible asyncio client.
+    
+    The cache is best effort: errors of the client (the `errors` classes) are logged and
+    reads report a miss, so a Redis outage falls back to MongoDB instead of failing requests.
+    """
+    
+    def __init__(self, redis_client, ttl: int, errors: Tuple[type, ...] = (OSError,)):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.errors = errors
+    
+    @staticmethod
+    def key(calendar_id: str) -> str:
+        return f"calendar_settings:{calendar_id}"
+    
+    async def get(self, calendar_id: str) -> Optional[dict]:
+        try:
+            data = await self.redis.get(self.key(calendar_id))
+        except self.errors as e:
+            logging.getLogger(__name__).warning(f"Settings cache read failed for {calendar_id}: {e}")
+            return None
+        return json.loads(data) if data else None
+    
+    async def set(self, calendar_id: str, settings: dict):
+        try:
+            await self.redis.set(self.key(calendar_id), json.dumps(settings), ex=self.ttl)
+        except self.errors as e:
+            logging.getLogger(__name__).warning(f"Settings cache write failed for {calendar_id}: {e}")
+            # Do not leave a stale copy behind if only the write failed
+            try:
+                await self.redis.delete(self.key(calendar_id))
+            except self.errors:
+                pass
+
+settings_cache = TTLCache(SETTINGS_CACHE_MAX_SIZE, SETTINGS_CACHE_TTL_SECONDS)
+CACHES["calendar_settings"] = settings_cache
+
+settings_store: Optional[RedisSettingsStore] = None
+if SETTINGS_CACHE_REDIS_URL:
+    try:
+        import redis.asyncio as redis_asyncio
+        settings_store = RedisSettingsStore(
+            redis_asyncio.from_url(SETTINGS_CACHE_REDIS_URL), SETTINGS_CACHE_TTL_SECONDS,
+            errors=(redis_asyncio.RedisError, OSError)
+        )
+    except ImportError:
+        logging.getLogger(__name__).warning("redis is not installed, using the in-process settings cache")
+
+async def load_calendar_settings(calendar_id: str) -> Optional[CompiledSchedule]:
+    """Read settings through the cache, falling back to MongoDB"""
+    if settings_store is None:
+        parsed = settings_cache.get(calendar_id)
+        if parsed is not None:
+            return parsed
+    else:
+        settings = await settings_store.get(calendar_id)
+        if settings is not None:
+            return load_schedule(settings)
+    
+    return await reload_calendar_settings(calendar_id)
+
+async def reload_calendar_settings(calendar_id: str) -> Optional[CompiledSchedule]:
+    """Read settings from MongoDB, bypassing and refreshing the cache"""
+    settings = await db.calendar_settings.find_one({"calendar_id": calendar_id}, {"_id": 0})
+    if not settings:
+        return None
+    return await cache_calendar_settings(calendar_id, settings)
+
+async def cache_calendar_settings(calendar_id: str, settings: dict) -> CompiledSchedule:
+    """Write-through: store freshly read or written settings in the cache"""
+    schedule = load_schedule(settings)
+    if settings_store is None:
+        settings_cache.set(calendar_id, schedule)
+    else:
+        await settings_store.set(calendar_id, {**schedule.raw, "compiled_schedule": compile_schedule(schedule.raw)})
+    return schedule
+
+# Slot engine
+def is_date_blocked(schedule: CompiledSchedule, target_date: date) -> bool:
+    """Check blocked dates and weekend blocks"""
+    return target_date.weekday() in schedule.blocked_weekdays or \
+           target_date.isoformat() in schedule.blocked_dates
+
+def get_day_time_ranges(schedule: CompiledSchedule, target_date: date) -> Tuple[Tuple[int, int], ...]:
+    """Resolve the working minute ranges of a date (empty if the date is blocked)"""
+    if is_date_blocked(schedule, target_date):
+        return ()
+    
+    # First priority: specific date hours, second priority: regular weekly hours
+    return schedule.overrides.get(target_date.isoformat()) or schedule.weekly[target_date.weekday()]
+
+def generate_slot_minutes(schedule: CompiledSchedule, target_date: date) -> List[int]:
+    """Generate every candidate slot start (minutes since midnight) of a date, ignoring bookings"""
+    duration = schedule.appointment_duration
+    step = duration + schedule.buffer_time
+    if duration <= 0 or step <= 0:
+        return []
+    
+    slots = []
+    for start, end in get_day_time_ranges(schedule, target_date):
+        slots.extend(range(start, end - duration + 1, step))
+    return slots
+
+SLOT_NOT_OFFERED = "Time is not one of the calendar's slots for that date"
+
+def is_bookable_slot(schedule: Optional[CompiledSchedule], target_date: date, minutes: int) -> bool:
+    """Whether minutes is a generated slot start of the date (blocked dates have none)"""
+    return schedule is not None and minutes in generate_slot_minutes(schedule, target_date)
+
+def generate_slot_times(schedule: CompiledSchedule, target_date: date) -> List[str]:
+    """Generate every candidate slot (HH:MM) of a date, ignoring bookings"""
+    return [format_minutes(minutes) for minutes in generate_slot_minutes(schedule, target_date)]
+
+class DayIntervals:
+    """Booked [start, end) minute intervals of one day.
+    
+    Starts are kept sorted next to a running maximum of the ends, so whether a new interval
+    overlaps any booking is a single bisect: only bookings starting before its end can
+    overlap, and one of them does iff the largest of their ends is past its start.
+    """
+    __slots__ = ("starts", "max_ends")
+    
+    def __init__(self, intervals: List[Tuple[int, int]] = ()):
+        intervals = sorted(intervals)
+        self.starts = [start for start, _ in intervals]
+        self.max_ends = list(itertools.accumulate((end for _, end in intervals), max))
+    
+    def __len__(self) -> int:
+        return len(self.starts)
+    
+    def overlaps(self, start: int, end: int) -> bool:
+        index = bisect.bisect_left(self.starts, end)
+        return index > 0 and self.max_ends[index - 1] > start
+
+NO_BOOKINGS = DayIntervals()
+
+def appointment_interval(appointment: dict, default_duration: int) -> Optional[Tuple[int, int]]:
+    """Minute interval an appointment occupies, using the settings duration for appointments stored without one"""
+    try:
+        start = parse_minutes(appointment["appointment_time"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    duration = appointment.get("duration") or default_duration
+    return start, start + max(duration, 1)
+
+async def fetch_booked_intervals(calendar_id: str, default_duration: int, start_date: str,
+                                 end_date: Optional[str] = None) -> Dict[str, DayIntervals]:
+    """Fetch the booked intervals of a date (or an inclusive date range) with a single query"""
+    query = {"calendar_id": calendar_id, "status": {"$ne": "cancelled"}}
+    if end_date is None or end_date == start_date:
+        query["appointment_date"] = start_date
+    else:
+        query["appointment_date"] = {"$gte": start_date, "$lte": end_date}
+    
+    intervals: Dict[str, List[Tuple[int, int]]] = {}
+    cursor = db.appointments.find(query, {"_id": 0, "appointment_date": 1, "appointment_time": 1, "duration": 1})
+    async for apt in cursor:
+        interval = appointment_interval(apt, default_duration)
+        if interval:
+            intervals.setdefault(apt["appointment_date"], []).append(interval)
+    return {date_string: DayIntervals(day) for date_string, day in intervals.items()}
+
+def compute_free_slot_minutes(schedule: CompiledSchedule, target_date: date, booked: DayIntervals) -> List[int]:
+    """Candidate slot starts of a date that do not overlap any booking, in order"""
+    duration = max(schedule.appointment_duration, 1)
+    return sorted(minutes for minutes in generate_slot_minutes(schedule, target_date)
+                  if not booked.overlaps(minutes, minutes + duration))
+
+def compute_free_slots(schedule: CompiledSchedule, target_date: date, booked: DayIntervals) -> List[str]:
+    return [format_minutes(minutes) for minutes in compute_free_slot_minutes(schedule, target_date, booked)]
+
+def iter_dates(start_date: date, end_date: date):
+    """Every date of an inclusive range, without stepping past end_date (which may be date.max)"""
+    for offset in range((end_date - start_date).days + 1):
+        yield start_date + timedelta(days=offset)
+
+def range_end(start_date: date, days: int) -> date:
+    """Last date of a range of days starting at start_date, capped at date.max instead of overflowing"""
+    return start_date + timedelta(days=min(days - 1, (date.max - start_date).days))
+
+def compute_dates_availability(settings: CompiledSchedule, start_date: date, end_date: date, booked: Dict[str, DayIntervals]) -> Dict[str, List[str]]:
+    """Classify every date of an inclusive range as available, blocked or without free slots"""
+    dates_info = {
+        "available_dates": [],
+        "blocked_dates": [],
+        "no_slots_dates": []
+    }
+    
+    for current_date in iter_dates(start_date, end_date):
+        date_string = current_date.isoformat()
+        if is_date_blocked(settings, current_date):
+            dates_info["blocked_dates"].append(date_string)
+        elif compute_free_slot_minutes(settings, current_date, booked.get(date_string, NO_BOOKINGS)):
+            dates_info["available_dates"].append(date_string)
+        else:
+            dates_info["no_slots_dates"].append(date_string)
+    
+    return dates_info
+
+def local_now() -> Tuple[date, int]:
+    """Today and the minutes elapsed since midnight, in the server's local time like date.today()"""
+    now = datetime.now()
+    return now.date(), now.hour * 60 + now.minute
+
+def iter_schedule_days(schedule: CompiledSchedule, start_date: date, end_date: date, start_minutes: int = 0):
+    """Lazily yield (date, candidate slot starts) for the working days of an inclusive range.
+    
+    Slots of start_date beginning before start_minutes (e.g. the current time) are skipped.
+    """
+    for current_date in iter_dates(start_date, end_date):
+        slots = generate_slot_minutes(schedule, current_date)
+        if current_date == start_date and start_minutes:
+            slots = [minutes for minutes in slots if minutes >= start_minutes]
+        if slots:
+            yield current_date, slots
+
+async def find_next_available(calendar_id: str, schedule: CompiledSchedule, start_date: date,
+                              end_date: date, start_minutes: int = 0) -> Optional[Tuple[date, int]]:
+    """Walk forward day by day and return the first free (date, minutes) before end_date,
+    not earlier than start_minutes on start_date.
+    
+    Bookings are fetched per week-sized window as the walk reaches it, so the cost follows the
+    distance to the first opening rather than the horizon.
+    """
+    duration = max(schedule.appointment_duration, 1)
+    booked: Dict[str, DayIntervals] = {}
+    window_end = None
+    for current_date, slots in iter_schedule_days(schedule, start_date, end_date, start_minutes):
+        if window_end is None or current_date > window_end:
+            window_end = min(range_end(current_date, NEXT_AVAILABLE_WINDOW_DAYS), end_date)
+            booked = await fetch_booked_intervals(calendar_id, schedule.appointment_duration,
+                                                  current_date.isoformat(), window_end.isoformat())
+        day = booked.get(current_date.isoformat(), NO_BOOKINGS)
+        for minutes in sorted(slots):
+            if not day.overlaps(minutes, minutes + duration):
+                return current_date, minutes
+    return None
+
+def iter_free_slots(schedule: CompiledSchedule, booked: Dict[str, DayIntervals], start_date: date, end_date: date,
+                    start_minutes: int = 0):
+    """Lazily yield (date string, minutes) of every free slot of an inclusive range, in order,
+    from start_minutes on start_date"""
+    duration = max(schedule.appointment_duration, 1)
+    for current_date, slots in iter_schedule_days(schedule, start_date, end_date, start_minutes):
+        date_string = current_date.isoformat()
+        day = booked.get(date_string, NO_BOOKINGS)
+        for minutes in sorted(slots):
+            if not day.overlaps(minutes, minutes + duration):
+                yield date_string, minutes
+
+async def fetch_booked_intervals_many(durations: Dict[str, int], start_date: str, end_date: str) -> Dict[str, Dict[str, DayIntervals]]:
+    """Booked intervals per calendar and date for many calendars with a single $in query"""
+    intervals: Dict[str, Dict[str, List[Tuple[int, int]]]] = {}
+    cursor = db.appointments.find(
+        {"calendar_id": {"$in": list(durations)}, "status": {"$ne": "cancelled"},
+         "appointment_date": {"$gte": start_date, "$lte": end_date}},
+        {"_id": 0, "calendar_id": 1, "appointment_date": 1, "appointment_time": 1, "duration": 1}
+    )
+    async for apt in cursor:
+        interval = appointment_interval(apt, durations[apt["calendar_id"]])
+        if interval:
+            intervals.setdefault(apt["calendar_id"], {}).setdefault(apt["appointment_date"], []).append(interval)
+    return {
+        calendar_id: {date_string: DayIntervals(day) for date_string, day in days.items()}
+        for calendar_id, days in intervals.items()
+    }
+
+async def earliest_slots_batch(calendar_ids: List[str], start_date: date, end_date: date, limit: int,
+                               semaphore: asyncio.Semaphore, start_minutes: int = 0) -> List[List[Tuple[str, int, str]]]:
+    """Earliest free (date, minutes, calendar_id) slots of each calendar, two queries per batch"""
+    async with semaphore:
+        schedules = {}
+        async for settings in db.calendar_settings.find({"calendar_id": {"$in": calendar_ids}}, {"_id": 0}):
+            schedules[settings["calendar_id"]] = load_schedule(settings)
+        if not schedules:
+            return []
+        booked = await fetch_booked_intervals_many(
+            {calendar_id: schedule.appointment_duration for calendar_id, schedule in schedules.items()},
+            start_date.isoformat(), end_date.isoformat()
+        )
+    
+    return [
+        [(date_string, minutes, calendar_id) for date_string, minutes in
+         itertools.islice(iter_free_slots(schedule, booked.get(calendar_id, {}), start_date, end_date, start_minutes), limit)]
+        for calendar_id, schedule in schedules.items()
+    ]
+
+# Materialized availability
+# One document per (calendar_id, date): candidate slot starts plus a bitmap of the free ones,
+# stamped with the revision of the settings it was built from.
+#
+# Every appointment change of a day bumps the document's "changes" counter and marks it stale
+# instead of recomputing it. Rebuilds read the counter before the bookings and only replace a
+# document whose counter did not move meanwhile, so an interleaved change can never be
+# overwritten by a result computed before it: the document stays stale and is rebuilt on read.
+def encode_bitmap(flags: List[bool]) -> bytes:
+    value = 0
+    for index, flag in enumerate(flags):
+        if flag:
+            value |= 1 << index
+    return value.to_bytes((len(flags) + 7) // 8, "little")
+
+def decode_bitmap(bitmap: bytes, size: int) -> List[bool]:
+    value = int.from_bytes(bitmap, "little")
+    return [bool(value >> index & 1) for index in range(size)]
+
+def build_availability_doc(calendar_id: str, schedule: CompiledSchedule, target_date: date, booked: DayIntervals,
+                           changes: int = 0) -> dict:
+    slots = generate_slot_minutes(schedule, target_date)
+    duration = max(schedule.appointment_duration, 1)
+    free = [not booked.overlaps(minutes, minutes + duration) for minutes in slots]
+    return {
+        "calendar_id": calendar_id,
+        "date": target_date.isoformat(),
+        "blocked": is_date_blocked(schedule, target_date),
+        "slots": slots,
+        "free": encode_bitmap(free),
+        "free_count": sum(free),
+        "settings_revision": schedule.revision,
+        "changes": changes,
+        "updated_at": datetime.now(timezone.utc)
+    }
+
+def in_availability_window(target_date: date) -> bool:
+    """Whether a day is stored: reads of other days (past, far future) must not grow the collection"""
+    return 0 <= (target_date - date.today()).days < AVAILABILITY_WINDOW_DAYS
+
+def availability_free_slots(doc: dict) -> List[str]:
+    flags = decode_bitmap(doc["free"], len(doc["slots"]))
+    return sorted(format_minutes(minutes) for minutes, free in zip(doc["slots"], flags) if free)
+
+async def materialize_availability(calendar_id: str, schedule: CompiledSchedule, start_date: date, end_date: date) -> Dict[str, dict]:
+    """Recompute the documents of an inclusive date range from one appointments query, storing
+    the days inside the availability window.
+    
+    A day changed while this ran keeps its stale document, the computed one is still returned.
+    """
+    date_range = {"$gte": start_date.isoformat(), "$lte": end_date.isoformat()}
+    # The counters must be read before the bookings they guard
+    changes = {
+        doc["date"]: doc.get("changes")
+        async for doc in db.availability.find({"calendar_id": calendar_id, "date": date_range}, {"_id": 0, "date": 1, "changes": 1})
+    }
+    booked = await fetch_booked_intervals(calendar_id, schedule.appointment_duration, start_date.isoformat(), end_date.isoformat())
+    docs = {}
+    operations = []
+    for current_date in iter_dates(start_date, end_date):
+        date_string = current_date.isoformat()
+        seen = changes.get(date_string)
+        doc = build_availability_doc(calendar_id, schedule, current_date, booked.get(date_string, NO_BOOKINGS), seen or 0)
+        docs[date_string] = doc
+        if not in_availability_window(current_date):
+            continue
+        # No document (or one from before the counter existed) is matched by $exists: false;
+        # if a counter appeared or moved meanwhile, the upsert hits the unique index and is dropped
+        guard = {"changes": seen} if seen is not None else {"changes": {"$exists": False}}
+        operations.append(ReplaceOne({"calendar_id": calendar_id, "date": date_string, **guard}, doc, upsert=True))
+    if operations:
+        try:
+            await db.availability.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+    return docs
+
+async def load_availability(calendar_id: str, schedule: CompiledSchedule, start_date: date, end_date: date) -> Dict[str, dict]:
+    """Stored documents of a date range, materializing the missing days on the way.
+    
+    Stale documents and documents built from another settings revision count as missing.
+    Settings are cached per process, so a document from a newer revision means ours are
+    stale and get reloaded first.
+    """
+    stored = []
+    async for doc in db.availability.find(
+        {"calendar_id": calendar_id, "date": {"$gte": start_date.isoformat(), "$lte": end_date.isoformat()}},
+        {"_id": 0}
+    ):
+        stored.append(doc)
+    
+    if any(doc.get("settings_revision", 0) > schedule.revision for doc in stored):
+        schedule = await reload_calendar_settings(calendar_id) or schedule
+    docs = {
+        doc["date"]: doc for doc in stored
+        if not doc.get("stale") and doc.get("settings_revision", 0) == schedule.revision
+    }
+    
+    missing = [current_date for current_date in iter_dates(start_date, end_date) if current_date.isoformat() not in docs]
+    if missing:
+        docs.update(await materialize_availability(calendar_id, schedule, missing[0], missing[-1]))
+    return docs
+
+def classify_availability_docs(docs: Dict[str, dict], start_date: date, end_date: date) -> Dict[str, List[str]]:
+    dates_info = {
+        "available_dates": [],
+        "blocked_dates": [],
+        "no_slots_dates": []
+    }
+    for current_date in iter_dates(start_date, end_date):
+        doc = docs[current_date.isoformat()]
+        if doc["blocked"]:
+            dates_info["blocked_dates"].append(doc["date"])
+        elif doc["free_count"]:
+            dates_info["available_dates"].append(doc["date"])
+        else:
+            dates_info["no_slots_dates"].append(doc["date"])
+    return dates_info
+
+async def mark_availability_changed(calendar_id: str, date_string: str):
+    """Record that appointments of a day changed, must be called after the appointment write.
+    The day is rebuilt on its next read."""
+    if not AVAILABILITY_MATERIALIZED:
+        return
+    try:
+        stored = in_availability_window(date.fromisoformat(date_string))
+    except ValueError:
+        stored = False
+    # Outside the window only an existing document (stored while the day was inside) is marked
+    await db.availability.update_one(
+        {"calendar_id": calendar_id, "date": date_string},
+        {"$inc": {"changes": 1}, "$set": {"stale": True}},
+        upsert=stored
+    )
+
+async def invalidate_availability(calendar_id: str):
+    """Mark the documents of a calendar stale after its settings changed, they are rebuilt on read.
+    Workers still caching the old settings cannot resurrect them: their revision no longer matches."""
+    if AVAILABILITY_MATERIALIZED:
+        await db.availability.update_many({"calendar_id": calendar_id}, {"$inc": {"changes": 1}, "$set": {"stale": True}})
+
+# MongoDB indexes
+# Declared per collection as (keys, options), matched to the query shape of the routes.
+# Indexes the code relies on for correctness, by name, with the fix when existing duplicates prevent the build
+REQUIRED_INDEXES = {
+    "unique_confirmed_slot": "resolve the duplicate confirmed bookings with backend/dedupe_slots.py",
+}
+
+MONGO_INDEXES = {
+    "users": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("email", ASCENDING)], {"unique": True}),
+    ],
+    "calendars": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("url_slug", ASCENDING)], {"unique": True}),
+        # Employer calendars, paginated by (created_at, id)
+        ([("employer_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+        # Client directory: active calendars of a location with a valid subscription,
+        # equality fields first, then the (created_at, id) page order, then the expiry range
+        ([("is_active", ASCENDING), ("location.province", ASCENDING), ("location.city", ASCENDING),
+          ("created_at", ASCENDING), ("id", ASCENDING), ("subscription_expires", ASCENDING)], {}),
+        # Directory search: accent-insensitive Spanish stemming, names weigh more than descriptions
+        ([("calendar_name", TEXT), ("business_name", TEXT), ("description", TEXT)],
+         {"name": "calendar_search", "default_language": "spanish",
+          "weights": {"calendar_name": 10, "business_name": 5, "description": 1}}),
+    ],
+    "calendar_settings": [
+        ([("calendar_id", ASCENDING)], {"unique": True}),
+    ],
+    "appointments": [
+        ([("id", ASCENDING)], {"unique": True}),
+        # Slot lookups by day and month ranges of a calendar
+        ([("calendar_id", ASCENDING), ("appointment_date", ASCENDING), ("appointment_time", ASCENDING),
+          ("status", ASCENDING)], {}),
+        # Calendar appointment listing, paginated by (appointment_date, appointment_time, id)
+        ([("calendar_id", ASCENDING), ("appointment_date", ASCENDING), ("appointment_time", ASCENDING),
+          ("id", ASCENDING)], {}),
+        # Client appointment history, paginated by (appointment_date, appointment_time, id)
+        ([("client_id", ASCENDING), ("appointment_date", ASCENDING), ("appointment_time", ASCENDING),
+          ("id", ASCENDING)], {}),
+        # Atomic slot reservation: at most one confirmed appointment per calendar slot
+        ([("calendar_id", ASCENDING), ("appointment_date", ASCENDING), ("appointment_time", ASCENDING)],
+         {"unique": True, "name": "unique_confirmed_slot", "partialFilterExpression": {"status": "confirmed"}}),
+    ],
+    "friendships": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("client_id", ASCENDING), ("employer_id", ASCENDING), ("status", ASCENDING)], {}),
+        # Pending requests and accepted services, paginated by (requested_at, id)
+        ([("employer_id", ASCENDING), ("status", ASCENDING), ("requested_at", ASCENDING), ("id", ASCENDING)], {}),
+        ([("client_id", ASCENDING), ("status", ASCENDING), ("requested_at", ASCENDING), ("id", ASCENDING)], {}),
+    ],
+    "availability": [
+        ([("calendar_id", ASCENDING), ("date", ASCENDING)], {"unique": True}),
+    ],
+    "subscription_plans": [
+        ([("name", ASCENDING)], {"unique": True}),
+    ],
+    "subscriptions": [
+        ([("calendar_id", ASCENDING)], {}),
+    ],
+    "mercadopago_settings": [
+        ([("employer_id", ASCENDING)], {"unique": True}),
+    ],
+}
+
+# Representative filter of each route query, checked with explain() when INDEX_SELF_CHECK is enabled
+QUERY_PLAN_CHECKS = [
+    ("POST /auth/login", "users", {"email": "check@example.com"}),
+    ("get_current_user", "users", {"id": "check"}),
+    ("GET /calendars (employer)", "calendars", {"employer_id": "check"}),
+    ("GET /calendars (client)", "calendars", {
+        "is_active": True, "location.province": "check", "location.city": "check",
+        "subscription_expires": {"$gte": datetime(2000, 1, 1, tzinfo=timezone.utc)}
+    }),
+    ("GET /calendars?search=", "calendars", {"$text": {"$search": "check"}, "is_active": True}),
+    ("GET /calendars/{url_slug}", "calendars", {"url_slug": "check", "is_active": True}),
+    ("GET /calendars/{id}/settings", "calendar_settings", {"calendar_id": "check"}),
+    ("GET /calendars/{id}/available-slots", "appointments", {
+        "calendar_id": "check", "appointment_date": "2000-01-01", "status": {"$ne": "cancelled"}
+    }),
+    ("GET /calendars/{id}/available-dates", "appointments", {
+        "calendar_id": "check", "appointment_date": {"$gte": "2000-01-01", "$lte": "2000-01-31"},
+        "status": {"$ne": "cancelled"}
+    }),
+    ("GET /calendars/{id}/appointments", "appointments", {"calendar_id": "check"}),
+    ("GET /availability/search", "appointments", {
+        "calendar_id": {"$in": ["check"]}, "appointment_date": {"$gte": "2000-01-01", "$lte": "2000-01-03"},
+        "status": {"$ne": "cancelled"}
+    }),
+    ("GET /calendars/{id}/appointments (window)", "appointments", {
+        "calendar_id": "check", "appointment_date": {"$gte": "2000-01-01", "$lte": "2000-01-31"}, "status": "confirmed"
+    }),
+    ("GET /appointments/my-appointments", "appointments", {"client_id": "check"}),
+    ("DELETE /appointments/{id}", "appointments", {"id": "check"}),
+    ("GET /friendships/status/{employer_id}", "friendships", {"client_id": "check", "employer_id": "check"}),
+    ("POST /friendships/statuses", "friendships", {"client_id": "check", "employer_id": {"$in": ["check"]}}),
+    ("GET /friendships/my-services", "friendships", {"client_id": "check", "status": "accepted"}),
+    ("GET /friendships/requests", "friendships", {"employer_id": "check", "status": "pending"}),
+    ("GET /calendars/{id}/available-dates (materialized)", "availability", {
+        "calendar_id": "check", "date": {"$gte": "2000-01-01", "$lte": "2000-01-31"}
+    }),
+]
+
+async def ensure_indexes():
+    """Create the declared indexes (create_index is a no-op for existing ones).
+    
+    A missing index only costs speed, except the REQUIRED_INDEXES that enforce correctness:
+    failing to build one of those aborts startup.
+    """
+    for collection_name, indexes in MONGO_INDEXES.items():
+        for keys, options in indexes:
+            try:
+                await db[collection_name].create_index(keys, **options)
+            except PyMongoError as e:
+                if options.get("name") in REQUIRED_INDEXES:
+                    logger.error(f"Could not create required index {options['name']} on {collection_name}: {e}")
+                    # The hint is for existing duplicates only, other errors (e.g. MongoDB unreachable) surface as they are
+                    if getattr(e, "code", None) != 11000:
+                        raise
+                    raise RuntimeError(
+                        f"Required index {options['name']} on {collection_name} could not be built: "
+                        f"{REQUIRED_INDEXES[options['name']]}"
+                    ) from e
+                logger.warning(f"Could not create index {keys} on {collection_name}: {e}")
+
+def find_plan_stages(plan) -> List[str]:
+    """Collect every stage name of an explain() plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(find_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(find_plan_stages(item))
+    return stages
+
+async def check_query_plans() -> List[str]:
+    """Explain every route query and report the ones doing a COLLSCAN"""
+    collscans = []
+    for route, collection_name, query in QUERY_PLAN_CHECKS:
+        try:
+            explanation = await db[collection_name].find(query).explain()
+        except PyMongoError as e:
+            logger.warning(f"Could not explain query of {route}: {e}")
+            continue
+        if "COLLSCAN" in find_plan_stages(explanation.get("queryPlanner", {}).get("winningPlan", {})):
+            logger.warning(f"Query of {route} on {collection_name} does a COLLSCAN: {query}")
+            collscans.append(route)
+    return collscans
+
 # Initialize subscription plans
 @app.on_event("startup")
 async def startup_event():
+    await ensure_indexes()
+    if INDEX_SELF_CHECK:
+        await check_query_plans()
+    await refresh_calendar_autocomplete()
+    current_locations()
+    
     # Create default subscription plans
     default_plans = [
         {"name": "Plan 30 días", "days": 30, "price_ars": 30000, "description": "Acceso completo por 30 días"},
@@ -259,7 +1599,7 @@ async def startup_event():
         existing = await db.subscription_plans.find_one({"name": plan_data["name"]})
         if not existing:
             plan = SubscriptionPlan(**plan_data)
-            await db.subscription_plans.insert_one(prepare_for_mongo(plan.dict()))
+            await db.subscription_plans.insert_one(to_mongo(plan))
 
 # Auth routes
 @api_router.post("/auth/register", response_model=User)
@@ -270,26 +1610,34 @@ async def register(user_data: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await async_get_password_hash(user_data.password)
     user_dict = user_data.dict()
     user_dict["password"] = hashed_password
     user = User(**user_dict)
     
     # Store user with password in database
-    user_dict_with_password = user.dict()
-    user_dict_with_password["password"] = hashed_password
-    await db.users.insert_one(prepare_for_mongo(user_dict_with_password))
+    user_document = to_mongo(user)
+    user_document["password"] = hashed_password
+    try:
+        await db.users.insert_one(user_document)
+    except DuplicateKeyError:
+        # Registered concurrently since the check above, caught by the unique email index
+        raise HTTPException(status_code=400, detail="Email already registered")
     return user
 
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_data: UserLogin):
     user = await db.users.find_one({"email": user_data.email})
-    if not user or not verify_password(user_data.password, user["password"]):
+    if not user or not await async_verify_password(user_data.password, user["password"]):
         raise HTTPException(status_code=401, detail="Incorrect email or password")
     
+    token_data = {"sub": user["id"]}
+    if JWT_STATELESS_CLAIMS:
+        token_data.update(user_claims(user))
+    
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user["id"]}, expires_delta=access_token_expires
+        data=token_data, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -313,33 +1661,45 @@ async def create_calendar(calendar_data: CalendarCreate, current_user: User = De
     calendar_dict["location"] = current_user.location.dict()  # Inherit employer's location
     calendar = Calendar(**calendar_dict)
     
-    await db.calendars.insert_one(prepare_for_mongo(calendar.dict()))
+    try:
+        await db.calendars.insert_one(to_mongo(calendar))
+    except DuplicateKeyError:
+        # Taken concurrently since the check above, caught by the unique url_slug index
+        raise HTTPException(status_code=400, detail="URL slug already exists")
     
     # Create default settings
     settings = CalendarSettings(calendar_id=calendar.id)
-    await db.calendar_settings.insert_one(prepare_for_mongo(settings.dict()))
+    settings_doc = to_mongo(settings)
+    settings_doc["compiled_schedule"] = compile_schedule(settings_doc)
+    await db.calendar_settings.insert_one(settings_doc)
+    await cache_calendar_settings(calendar.id, settings_doc)
     
     # Create free subscription if enabled
     if LICENCE_FREE:
         free_sub = create_free_subscription(current_user.id, calendar.id)
         if free_sub:
-            await db.subscriptions.insert_one(prepare_for_mongo(free_sub.dict()))
+            await db.subscriptions.insert_one(to_mongo(free_sub))
             # Update calendar with subscription expiry
             calendar.subscription_expires = free_sub.expires_at
             await db.calendars.update_one(
                 {"id": calendar.id},
-                {"$set": {"subscription_expires": free_sub.expires_at.isoformat()}}
+                {"$set": {"subscription_expires": free_sub.expires_at}}
             )
     
+    calendar_autocomplete.add(calendar.dict())
     return calendar
 
-@api_router.get("/calendars", response_model=List[Calendar])
+@api_router.get("/calendars", response_model=List[CalendarListItem])
 async def get_calendars(
+    response: Response,
     current_user: User = Depends(get_current_user),
     search: Optional[str] = None,
     category: Optional[str] = None,
     province: Optional[str] = None,
-    city: Optional[str] = None
+    city: Optional[str] = None,
+    include_friendship_status: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
 ):
     query = {}
     
@@ -361,30 +1721,61 @@ async def get_calendars(
                 query["location.city"] = city
         
         # Only show calendars with active subscriptions
-        current_time = datetime.now(timezone.utc).isoformat()
-        query["subscription_expires"] = {"$gte": current_time}
-    
-    # Add search filters
-    if search:
-        search_regex = {"$regex": search, "$options": "i"}
-        query["$or"] = [
-            {"calendar_name": search_regex},
-            {"business_name": search_regex},
-            {"description": search_regex}
-        ]
+        query["subscription_expires"] = {"$gte": datetime.now(timezone.utc)}
     
     if category and category != 'all':
         query["category"] = category
     
-    calendars = await db.calendars.find(query).to_list(100)
-    return [Calendar(**parse_from_mongo(cal)) for cal in calendars]
+    # Search results are ranked by relevance, plain listings keep the (created_at, id) order
+    search = search.strip() if search else None
+    if search:
+        calendars = await search_calendars(query, search, response, cursor, limit)
+    else:
+        calendars = await fetch_page(db.calendars, query, ["created_at", "id"], response, cursor, limit)
+    result = [from_mongo(CalendarListItem, cal) for cal in calendars]
+    
+    # Annotate each calendar with the client's friendship status in one query
+    if include_friendship_status and current_user.user_type == "client":
+        statuses = await fetch_friendship_statuses(current_user.id, [cal.employer_id for cal in result])
+        for cal in result:
+            cal.friendship_status = statuses[cal.employer_id]
+    
+    return result
+
+@api_router.get("/calendars/autocomplete")
+async def autocomplete_calendars(
+    q: str,
+    current_user: User = Depends(get_current_user),
+    category: Optional[str] = None,
+    province: Optional[str] = None,
+    city: Optional[str] = None,
+    limit: int = Query(AUTOCOMPLETE_DEFAULT_LIMIT, ge=1, le=AUTOCOMPLETE_MAX_LIMIT)
+):
+    """Typeahead over calendar and business names, served from the in-memory prefix index"""
+    # Same location defaults as the client directory in GET /calendars
+    if not province and not city:
+        province = current_user.location.province
+        city = current_user.location.city
+    
+    schedule_autocomplete_refresh()
+    matches = calendar_autocomplete.search(
+        q,
+        province=None if province == 'all' else province,
+        city=None if city == 'all' else city,
+        category=None if category == 'all' else category,
+        limit=limit
+    )
+    return [
+        {key: entry[key] for key in ("id", "calendar_name", "business_name", "url_slug")}
+        for entry in matches
+    ]
 
 @api_router.get("/calendars/{url_slug}", response_model=Calendar)
 async def get_calendar_by_slug(url_slug: str):
     calendar = await db.calendars.find_one({"url_slug": url_slug, "is_active": True})
     if not calendar:
         raise HTTPException(status_code=404, detail="Calendar not found")
-    return Calendar(**parse_from_mongo(calendar))
+    return from_mongo(Calendar, calendar)
 
 # Calendar settings routes
 @api_router.put("/calendars/{calendar_id}/settings")
@@ -407,25 +1798,32 @@ async def update_calendar_settings(calendar_id: str, settings_data: CalendarSett
     settings_dict = settings_data.dict()
     settings_dict["calendar_id"] = calendar_id
     
-    await db.calendar_settings.update_one(
+    # Compile once on save so slot generation never parses time strings
+    try:
+        settings_dict["compiled_schedule"] = compile_schedule(settings_dict)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid time range, expected HH:MM")
+    
+    settings = await db.calendar_settings.find_one_and_update(
         {"calendar_id": calendar_id},
-        {"$set": prepare_for_mongo(settings_dict)},
-        upsert=True
+        {"$set": settings_dict, "$inc": {"revision": 1}},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
+    await cache_calendar_settings(calendar_id, settings)
+    await invalidate_availability(calendar_id)
     return {"message": "Settings updated successfully"}
 
 @api_router.get("/calendars/{calendar_id}/settings")
 async def get_calendar_settings(calendar_id: str):
-    settings = await db.calendar_settings.find_one({"calendar_id": calendar_id})
+    settings = await load_calendar_settings(calendar_id)
     if not settings:
         # Return default settings
         default_settings = CalendarSettings(calendar_id=calendar_id)
         return default_settings.dict()
     
-    # Remove MongoDB ObjectId and return clean data
-    if '_id' in settings:
-        del settings['_id']
-    return settings
+    return settings.raw
 
 # Friendship system
 @api_router.post("/friendships/request")
@@ -451,23 +1849,29 @@ async def request_friendship(request_data: FriendshipRequest, current_user: User
         employer_id=request_data.employer_id
     )
     
-    await db.friendships.insert_one(prepare_for_mongo(friendship.dict()))
+    await db.friendships.insert_one(to_mongo(friendship))
     return {"message": "Friendship request sent successfully"}
 
 @api_router.get("/friendships/requests")
-async def get_friendship_requests(current_user: User = Depends(get_current_user)):
+async def get_friendship_requests(
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    loaders: Loaders = Depends(get_loaders)
+):
     if current_user.user_type != "employer":
         raise HTTPException(status_code=403, detail="Only employers can view friendship requests")
     
-    requests = await db.friendships.find({
-        "employer_id": current_user.id,
-        "status": "pending"
-    }).to_list(100)
+    requests = await fetch_page(
+        db.friendships, {"employer_id": current_user.id, "status": "pending"},
+        ["requested_at", "id"], response, cursor, limit
+    )
     
-    # Get client info for each request
+    # Get client info for every request with one batched query
+    clients = await loaders.users.load_many([req["client_id"] for req in requests])
     result = []
-    for req in requests:
-        client = await db.users.find_one({"id": req["client_id"]})
+    for req, client in zip(requests, clients):
         if client:
             result.append({
                 "id": req["id"],
@@ -503,32 +1907,42 @@ async def respond_to_friendship(friendship_id: str, response_data: dict, current
         {"id": friendship_id},
         {"$set": {
             "status": new_status,
-            "responded_at": datetime.now(timezone.utc).isoformat()
+            "responded_at": datetime.now(timezone.utc)
         }}
     )
     
     return {"message": f"Friendship request {'accepted' if accept else 'rejected'}", "status": new_status}
 
 @api_router.get("/friendships/my-services")
-async def get_my_services(current_user: User = Depends(get_current_user)):
+async def get_my_services(
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    loaders: Loaders = Depends(get_loaders)
+):
     if current_user.user_type != "client":
         raise HTTPException(status_code=403, detail="Only clients can view their services")
     
     # Get accepted friendships
-    friendships = await db.friendships.find({
-        "client_id": current_user.id,
-        "status": "accepted"
-    }).to_list(100)
+    friendships = await fetch_page(
+        db.friendships, {"client_id": current_user.id, "status": "accepted"},
+        ["requested_at", "id"], response, cursor, limit
+    )
+    
+    # Get calendars and employers for these friendships, one batched query each
+    employer_ids = [friendship["employer_id"] for friendship in friendships]
+    calendars, employers = await asyncio.gather(
+        loaders.calendars_by_employer.load_many(employer_ids),
+        loaders.users.load_many(employer_ids)
+    )
     
-    # Get calendars for these friendships
     result = []
-    for friendship in friendships:
-        calendar = await db.calendars.find_one({"employer_id": friendship["employer_id"]})
+    for friendship, calendar, employer in zip(friendships, calendars, employers):
         if calendar:
-            employer = await db.users.find_one({"id": friendship["employer_id"]})
             result.append({
                 "friendship_id": friendship["id"],
-                "calendar": Calendar(**parse_from_mongo(calendar)).dict(),
+                "calendar": from_mongo(Calendar, calendar).dict(),
                 "employer": {
                     "id": employer["id"],
                     "full_name": employer["full_name"],
@@ -549,14 +1963,15 @@ async def get_friendship_status(employer_id: str, current_user: User = Depends(g
         "employer_id": employer_id
     })
     
-    if not friendship:
-        return {"status": "none", "can_request": True}
+    return friendship_status_info(friendship)
+
+@api_router.post("/friendships/statuses")
+async def get_friendship_statuses(request_data: FriendshipStatusesRequest, current_user: User = Depends(get_current_user)):
+    """Get the friendship status with many employers at once, keyed by employer id"""
+    if current_user.user_type != "client":
+        raise HTTPException(status_code=403, detail="Only clients can check friendship status")
     
-    return {
-        "status": friendship["status"],
-        "can_request": friendship["status"] in ["blocked"],
-        "friendship_id": friendship["id"]
-    }
+    return await fetch_friendship_statuses(current_user.id, request_data.employer_ids)
 
 @api_router.delete("/friendships/{friendship_id}")
 async def remove_friendship(friendship_id: str, current_user: User = Depends(get_current_user)):
@@ -589,65 +2004,284 @@ async def create_appointment(calendar_id: str, appointment_data: AppointmentCrea
         if not friendship:
             raise HTTPException(status_code=403, detail="You need to be accepted as a friend to book appointments")
     
-    # Check if slot is available
-    existing = await db.appointments.find_one({
-        "calendar_id": calendar_id,
-        "appointment_date": appointment_data.appointment_date,
-        "appointment_time": appointment_data.appointment_time,
-        "status": {"$ne": "cancelled"}
-    })
-    if existing:
-        raise HTTPException(status_code=400, detail="Time slot not available")
+    try:
+        start = parse_minutes(appointment_data.appointment_time)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid time format, expected HH:MM")
+    try:
+        target_date = date.fromisoformat(appointment_data.appointment_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    
+    # Writes read settings from MongoDB: a stale cached duration would be stored on the appointment
+    schedule = await reload_calendar_settings(calendar_id)
+    duration = schedule.appointment_duration if schedule else DEFAULT_APPOINTMENT_DURATION
+    # Only generated slots can be booked: off-grid starts would block two slots, and on the grid
+    # concurrent conflicts share a start time that the unique index catches
+    if not is_bookable_slot(schedule, target_date, start):
+        raise HTTPException(status_code=400, detail=SLOT_NOT_OFFERED)
     
     appointment_dict = appointment_data.dict()
     appointment_dict.update({
+        # Stored normalized ("9:00" -> "09:00"): the unique index and the listings compare strings
+        "appointment_time": format_minutes(start),
         "calendar_id": calendar_id,
         "client_id": current_user.id,
         "client_name": current_user.full_name,
-        "client_email": current_user.email
+        "client_email": current_user.email,
+        "duration": duration
     })
     
     appointment = Appointment(**appointment_dict)
-    await db.appointments.insert_one(prepare_for_mongo(appointment.dict()))
+    
+    # Partial overlaps with existing bookings (e.g. after a duration change) are rejected here,
+    # the unique_confirmed_slot index rejects the insert if the same slot got booked meanwhile.
+    # The index only guards identical start times: right after a duration or hours change, the
+    # new grid can overlap bookings of the old one, and concurrent requests for overlapping
+    # slots with different starts can then both pass this check and succeed.
+    booked = await fetch_booked_intervals(calendar_id, duration, appointment.appointment_date)
+    if booked.get(appointment.appointment_date, NO_BOOKINGS).overlaps(start, start + max(duration, 1)):
+        raise HTTPException(status_code=400, detail="Time slot not available")
+    try:
+        await db.appointments.insert_one(to_mongo(appointment))
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Time slot not available")
+    await mark_availability_changed(calendar_id, appointment.appointment_date)
     return appointment
 
+@api_router.post("/calendars/{calendar_id}/appointments/bulk")
+async def create_appointments_bulk(calendar_id: str, request_data: BulkAppointmentCreate, current_user: User = Depends(get_current_user)):
+    """Book many slots (explicit list and/or recurrence rule) with batched checks and one insert_many"""
+    if request_data.mode not in BULK_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode, expected one of {', '.join(BULK_MODES)}")
+    
+    slots = expand_bulk_slots(request_data)
+    if not slots:
+        raise HTTPException(status_code=400, detail="No appointments to book")
+    if len(slots) > MAX_BULK_APPOINTMENTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_APPOINTMENTS} appointments per request")
+    
+    calendar = await db.calendars.find_one({"id": calendar_id, "is_active": True})
+    if not calendar:
+        raise HTTPException(status_code=404, detail="Calendar not found")
+    
+    # Check if friendship exists (client-employer relationship)
+    if current_user.user_type == "client":
+        friendship = await db.friendships.find_one({
+            "client_id": current_user.id,
+            "employer_id": calendar["employer_id"],
+            "status": "accepted"
+        })
+        if not friendship:
+            raise HTTPException(status_code=403, detail="You need to be accepted as a friend to book appointments")
+    
+    schedule = await reload_calendar_settings(calendar_id)
+    duration = schedule.appointment_duration if schedule else DEFAULT_APPOINTMENT_DURATION
+    
+    # Every requested date is checked against existing bookings with one query
+    booked_by_date: Dict[str, List[Tuple[int, int]]] = {}
+    async for apt in db.appointments.find(
+        {"calendar_id": calendar_id, "status": {"$ne": "cancelled"},
+         "appointment_date": {"$in": list({slot.appointment_date for slot in slots})}},
+        {"_id": 0, "appointment_date": 1, "appointment_time": 1, "duration": 1}
+    ):
+        interval = appointment_interval(apt, duration)
+        if interval:
+            booked_by_date.setdefault(apt["appointment_date"], []).append(interval)
+    booked = {date_string: DayIntervals(intervals) for date_string, intervals in booked_by_date.items()}
+    
+    results = []
+    appointments = []
+    requested: Dict[str, List[Tuple[int, int]]] = {}
+    for slot in slots:
+        result = {"appointment_date": slot.appointment_date, "appointment_time": slot.appointment_time}
+        error = None
+        try:
+            target_date = date.fromisoformat(slot.appointment_date)
+            start = parse_minutes(slot.appointment_time)
+        except ValueError:
+            error = "Invalid date or time format"
+        if error is None:
+            # Normalized like create_appointment, the results echo the stored values
+            result["appointment_time"] = format_minutes(start)
+            end = start + max(duration, 1)
+            if not is_bookable_slot(schedule, target_date, start):
+                error = SLOT_NOT_OFFERED
+            elif booked.get(slot.appointment_date, NO_BOOKINGS).overlaps(start, end):
+                error = "Time slot not available"
+            elif any(start < other_end and other_start < end for other_start, other_end in requested.get(slot.appointment_date, [])):
+                error = "Duplicate slot in request"
+            else:
+                requested.setdefault(slot.appointment_date, []).append((start, end))
+        
+        if error:
+            result.update({"status": "failed", "error": error})
+        else:
+            appointment = Appointment(
+                calendar_id=calendar_id,
+                client_id=current_user.id,
+                client_name=current_user.full_name,
+                client_email=current_user.email,
+                appointment_date=slot.appointment_date,
+                appointment_time=result["appointment_time"],
+                notes=request_data.notes,
+                duration=duration
+            )
+            appointments.append(appointment)
+            result.update({"status": "created", "appointment": appointment})
+        results.append(result)
+    
+    require_all = request_data.mode == "require_all"
+    if require_all and len(appointments) != len(slots):
+        return bulk_booking_failure(results)
+    
+    # Slots booked concurrently since the check are rejected by the unique_confirmed_slot index
+    # (identical start times only, see create_appointment);
+    # in require_all mode the rest of the batch is then deleted again (see BULK_MODES)
+    if appointments:
+        try:
+            await db.appointments.insert_many([to_mongo(apt) for apt in appointments], ordered=False)
+        except BulkWriteError as e:
+            # Readers may have seen the rolled back bookings too, every attempted day is marked
+            for appointment_date in {apt.appointment_date for apt in appointments}:
+                await mark_availability_changed(calendar_id, appointment_date)
+            failed_ids = {appointments[error["index"]].id for error in e.details.get("writeErrors", [])}
+            for result in results:
+                if result["status"] == "created" and result["appointment"].id in failed_ids:
+                    result.update({"status": "failed", "error": "Time slot not available"})
+                    del result["appointment"]
+            if require_all:
+                try:
+                    await db.appointments.delete_many({"id": {"$in": [apt.id for apt in appointments if apt.id not in failed_ids]}})
+                except PyMongoError as rollback_error:
+                    # The created items of the results are the bookings that were kept
+                    logger.error(f"Could not roll back bulk booking on {calendar_id}: {rollback_error}")
+                    created = sum(1 for result in results if result["status"] == "created")
+                    return JSONResponse(status_code=500, content=jsonable_encoder({
+                        "detail": "Some appointments could not be booked and the rollback failed",
+                        "created": created,
+                        "failed": len(results) - created,
+                        "results": results
+                    }))
+                # Marked again after the rollback, a rebuild may have run in between
+                for appointment_date in {apt.appointment_date for apt in appointments}:
+                    await mark_availability_changed(calendar_id, appointment_date)
+                return bulk_booking_failure(results)
+        else:
+            for appointment_date in {apt.appointment_date for apt in appointments}:
+                await mark_availability_changed(calendar_id, appointment_date)
+    
+    created = sum(1 for result in results if result["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+def bulk_booking_failure(results: List[dict]) -> JSONResponse:
+    """require_all response: nothing was booked, failed items keep their error"""
+    for result in results:
+        if result["status"] == "created":
+            result["status"] = "skipped"
+            del result["appointment"]
+    return JSONResponse(status_code=400, content={
+        "detail": "Some appointments could not be booked",
+        "created": 0,
+        "failed": sum(1 for result in results if result["status"] == "failed"),
+        "results": results
+    })
+
+@api_router.get("/calendars/{calendar_id}/appointments/export")
+async def export_calendar_appointments(
+    calendar_id: str,
+    current_user: User = Depends(get_current_user),
+    export_format: str = Query("ndjson", alias="format"),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to")
+):
+    """Stream the calendar's appointment history as NDJSON or CSV"""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format, expected one of {', '.join(EXPORT_FORMATS)}")
+    
+    calendar = await db.calendars.find_one({"id": calendar_id, "employer_id": current_user.id})
+    if not calendar:
+        raise HTTPException(status_code=404, detail="Calendar not found or not authorized")
+    
+    query = {"calendar_id": calendar_id}
+    appointment_date = date_range_filter(parse_date_param(date_from, "from"), parse_date_param(date_to, "to"))
+    if appointment_date:
+        query["appointment_date"] = appointment_date
+    
+    return StreamingResponse(
+        stream_appointments_export(query, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="appointments-{calendar["url_slug"]}.{export_format}"'}
+    )
+
 @api_router.get("/calendars/{calendar_id}/appointments", response_model=List[Appointment])
-async def get_calendar_appointments(calendar_id: str, current_user: User = Depends(get_current_user)):
+async def get_calendar_appointments(
+    calendar_id: str,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    appointment_status: Optional[str] = Query(None, alias="status"),
+    cursor: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    if appointment_status and appointment_status not in APPOINTMENT_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status, expected one of {', '.join(APPOINTMENT_STATUSES)}")
+    
     # Check authorization
     calendar = await db.calendars.find_one({"id": calendar_id})
     if not calendar:
         raise HTTPException(status_code=404, detail="Calendar not found")
     
     # Employers can see all appointments, clients only their own
-    if current_user.user_type == "employer" and calendar["employer_id"] == current_user.id:
-        appointments = await db.appointments.find({"calendar_id": calendar_id}).to_list(1000)
-    else:
-        appointments = await db.appointments.find({
-            "calendar_id": calendar_id,
-            "client_id": current_user.id
-        }).to_list(1000)
+    query = {"calendar_id": calendar_id}
+    if not (current_user.user_type == "employer" and calendar["employer_id"] == current_user.id):
+        query["client_id"] = current_user.id
+    
+    # Restrict to the visible window so the cost scales with it instead of the whole history
+    appointment_date = date_range_filter(parse_date_param(date_from, "from"), parse_date_param(date_to, "to"))
+    if appointment_date:
+        query["appointment_date"] = appointment_date
+    if appointment_status:
+        query["status"] = appointment_status
+    
+    appointments = await fetch_page(
+        db.appointments, query, ["appointment_date", "appointment_time", "id"], response, cursor, limit
+    )
     
-    return [Appointment(**parse_from_mongo(apt)) for apt in appointments]
+    return [from_mongo(Appointment, apt) for apt in appointments]
 
 @api_router.get("/appointments/my-appointments")
-async def get_my_appointments(current_user: User = Depends(get_current_user)):
+async def get_my_appointments(
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    loaders: Loaders = Depends(get_loaders)
+):
     """Get all appointments for the current client"""
     if current_user.user_type != "client":
         raise HTTPException(status_code=403, detail="Only clients can view their appointments")
     
-    appointments = await db.appointments.find({
-        "client_id": current_user.id
-    }).to_list(1000)
+    query = {"client_id": current_user.id}
+    appointment_date = date_range_filter(parse_date_param(date_from, "from"), parse_date_param(date_to, "to"))
+    if appointment_date:
+        query["appointment_date"] = appointment_date
+    
+    appointments = await fetch_page(
+        db.appointments, query, ["appointment_date", "appointment_time", "id"], response, cursor, limit
+    )
+    
+    # Enrich with calendar and professional information using one batched query per collection
+    calendars = await loaders.calendars.load_many([apt["calendar_id"] for apt in appointments])
+    professionals = await loaders.users.load_many([cal["employer_id"] if cal else None for cal in calendars])
     
-    # Enrich with calendar and professional information
     enriched_appointments = []
-    for apt in appointments:
-        calendar = await db.calendars.find_one({"id": apt["calendar_id"]})
+    for apt, calendar, professional in zip(appointments, calendars, professionals):
         if calendar:
-            # Get professional (employer) information
-            professional = await db.users.find_one({"id": calendar["employer_id"]})
-            
-            apt_dict = parse_from_mongo(apt)
+            apt_dict = dict(apt)
             # Remove MongoDB ObjectId if present
             if '_id' in apt_dict:
                 del apt_dict['_id']
@@ -687,14 +2321,51 @@ async def delete_appointment(appointment_id: str, current_user: User = Depends(g
     if not calendar:
         raise HTTPException(status_code=404, detail="Calendar not found")
     
-    # Only the client who made the appointment or the employer can delete it
-    if (current_user.user_type == "client" and appointment["client_id"] != current_user.id) or \
-       (current_user.user_type == "employer" and calendar["employer_id"] != current_user.id):
+    if not can_delete_appointment(current_user, appointment, calendar):
         raise HTTPException(status_code=403, detail="Not authorized to delete this appointment")
     
     await db.appointments.delete_one({"id": appointment_id})
+    await mark_availability_changed(appointment["calendar_id"], appointment["appointment_date"])
     return {"message": "Appointment deleted successfully"}
 
+@api_router.post("/appointments/bulk-delete")
+async def bulk_delete_appointments(request_data: BulkAppointmentDelete, current_user: User = Depends(get_current_user), loaders: Loaders = Depends(get_loaders)):
+    """Delete many appointments with batched lookups and a single delete_many"""
+    if request_data.mode not in BULK_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode, expected one of {', '.join(BULK_MODES)}")
+    if not request_data.appointment_ids:
+        raise HTTPException(status_code=400, detail="No appointments to delete")
+    
+    appointment_ids = list(dict.fromkeys(request_data.appointment_ids))
+    appointments = await loaders.appointments.load_many(appointment_ids)
+    calendars = await loaders.calendars.load_many([apt["calendar_id"] if apt else None for apt in appointments])
+    
+    results = []
+    deletable = []
+    for appointment_id, appointment, calendar in zip(appointment_ids, appointments, calendars):
+        if not appointment:
+            results.append({"appointment_id": appointment_id, "status": "failed", "error": "Appointment not found"})
+        elif not calendar:
+            results.append({"appointment_id": appointment_id, "status": "failed", "error": "Calendar not found"})
+        elif not can_delete_appointment(current_user, appointment, calendar):
+            results.append({"appointment_id": appointment_id, "status": "failed", "error": "Not authorized to delete this appointment"})
+        else:
+            results.append({"appointment_id": appointment_id, "status": "deleted"})
+            deletable.append(appointment)
+    
+    if request_data.mode == "require_all" and len(deletable) != len(appointment_ids):
+        for result in results:
+            if result["status"] == "deleted":
+                result["status"] = "skipped"
+        return JSONResponse(status_code=400, content={"detail": "Some appointments could not be deleted", "deleted": 0, "results": results})
+    
+    if deletable:
+        await db.appointments.delete_many({"id": {"$in": [apt["id"] for apt in deletable]}})
+        for calendar_id, appointment_date in {(apt["calendar_id"], apt["appointment_date"]) for apt in deletable}:
+            await mark_availability_changed(calendar_id, appointment_date)
+    
+    return {"deleted": len(deletable), "results": results}
+
 @api_router.get("/calendars/{calendar_id}/available-dates")
 async def get_available_dates(calendar_id: str, month: int, year: int):
     """Get available dates for a calendar in a specific month"""
@@ -702,45 +2373,89 @@ async def get_available_dates(calendar_id: str, month: int, year: int):
     if not calendar:
         raise HTTPException(status_code=404, detail="Calendar not found")
     
-    settings = await db.calendar_settings.find_one({"calendar_id": calendar_id})
+    settings = await load_calendar_settings(calendar_id)
     if not settings:
         return {"available_dates": [], "blocked_dates": [], "no_slots_dates": []}
     
     import calendar as cal
-    from datetime import date
     
-    # Get all dates in the month
+    # Only the remaining days of the month are computed
     _, last_day = cal.monthrange(year, month)
-    dates_info = {
-        "available_dates": [],
-        "blocked_dates": [],
-        "no_slots_dates": []
+    start_date = max(date(year, month, 1), date.today())
+    end_date = date(year, month, last_day)
+    if start_date > end_date:
+        return {"available_dates": [], "blocked_dates": [], "no_slots_dates": []}
+    
+    if AVAILABILITY_MATERIALIZED:
+        docs = await load_availability(calendar_id, settings, start_date, end_date)
+        return classify_availability_docs(docs, start_date, end_date)
+    
+    # One range query for the whole month instead of one per slot and day
+    booked = await fetch_booked_intervals(calendar_id, settings.appointment_duration, start_date.isoformat(), end_date.isoformat())
+    return compute_dates_availability(settings, start_date, end_date, booked)
+
+@api_router.get("/calendars/{calendar_id}/available-slots/range")
+async def get_available_slots_range(
+    calendar_id: str,
+    date_from: str = Query(..., alias="from"),
+    date_to: str = Query(..., alias="to")
+):
+    """Get available time slots for every date of an inclusive range, keyed by date"""
+    start_date = date.fromisoformat(parse_date_param(date_from, "from"))
+    end_date = date.fromisoformat(parse_date_param(date_to, "to"))
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="to must not be before from")
+    if (end_date - start_date).days + 1 > MAX_SLOTS_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SLOTS_RANGE_DAYS} days per request")
+    
+    calendar = await db.calendars.find_one({"id": calendar_id, "is_active": True})
+    if not calendar:
+        raise HTTPException(status_code=404, detail="Calendar not found")
+    
+    date_strings = [(start_date + timedelta(days=offset)).isoformat() for offset in range((end_date - start_date).days + 1)]
+    settings = await load_calendar_settings(calendar_id)
+    if not settings:
+        return {date_string: [] for date_string in date_strings}
+    
+    if AVAILABILITY_MATERIALIZED:
+        docs = await load_availability(calendar_id, settings, start_date, end_date)
+        return {date_string: availability_free_slots(docs[date_string]) for date_string in date_strings}
+    
+    # One settings load and one range query for the whole span
+    booked = await fetch_booked_intervals(calendar_id, settings.appointment_duration, start_date.isoformat(), end_date.isoformat())
+    return {
+        date_string: compute_free_slots(settings, date.fromisoformat(date_string), booked.get(date_string, NO_BOOKINGS))
+        for date_string in date_strings
     }
+
+@api_router.get("/calendars/{calendar_id}/next-available")
+async def get_next_available(
+    calendar_id: str,
+    date_from: Optional[str] = Query(None, alias="from"),
+    days: int = Query(NEXT_AVAILABLE_DEFAULT_DAYS, ge=1, le=NEXT_AVAILABLE_MAX_DAYS)
+):
+    """Get the earliest free slot from a date (default today) within a horizon of days"""
+    calendar = await db.calendars.find_one({"id": calendar_id, "is_active": True})
+    if not calendar:
+        raise HTTPException(status_code=404, detail="Calendar not found")
     
-    for day in range(1, last_day + 1):
-        current_date = date(year, month, day)
-        date_string = current_date.isoformat()
-        
-        # Skip past dates
-        if current_date < date.today():
-            continue
-        
-        # Check if date is blocked
-        day_of_week = current_date.weekday()
-        if (date_string in settings.get("blocked_dates", [])) or \
-           (day_of_week == 5 and settings.get("blocked_saturdays", False)) or \
-           (day_of_week == 6 and settings.get("blocked_sundays", False)):
-            dates_info["blocked_dates"].append(date_string)
-            continue
-        
-        # Check if date has available slots
-        available_slots_response = await get_available_slots(calendar_id, date_string)
-        if available_slots_response:
-            dates_info["available_dates"].append(date_string)
-        else:
-            dates_info["no_slots_dates"].append(date_string)
+    date_from = parse_date_param(date_from, "from")
+    today, now_minutes = local_now()
+    start_date = max(date.fromisoformat(date_from) if date_from else today, today)
+    # Slots of today that already started are not available anymore
+    start_minutes = now_minutes if start_date == today else 0
+    end_date = range_end(start_date, days)
+    result = {"appointment_date": None, "appointment_time": None, "searched_until": end_date.isoformat()}
     
-    return dates_info
+    settings = await load_calendar_settings(calendar_id)
+    if not settings:
+        return result
+    
+    found = await find_next_available(calendar_id, settings, start_date, end_date, start_minutes)
+    if found:
+        result["appointment_date"] = found[0].isoformat()
+        result["appointment_time"] = format_minutes(found[1])
+    return result
 
 @api_router.get("/calendars/{calendar_id}/available-slots")
 async def get_available_slots(calendar_id: str, date: str):
@@ -749,90 +2464,99 @@ async def get_available_slots(calendar_id: str, date: str):
     if not calendar:
         raise HTTPException(status_code=404, detail="Calendar not found")
     
-    settings = await db.calendar_settings.find_one({"calendar_id": calendar_id})
+    settings = await load_calendar_settings(calendar_id)
     if not settings:
         return []
     
     # Parse the date
     try:
         target_date = datetime.fromisoformat(date).date()
-        day_of_week = target_date.weekday()  # 0=Monday, 6=Sunday
     except:
         raise HTTPException(status_code=400, detail="Invalid date format")
     
-    # Check if date is blocked
-    if date in settings.get("blocked_dates", []):
-        return []
-    
-    # Check weekend blocks
-    if day_of_week == 5 and settings.get("blocked_saturdays", False):  # Saturday
-        return []
-    if day_of_week == 6 and settings.get("blocked_sundays", False):   # Sunday
-        return []
-    
-    # Get time ranges for this date
-    time_ranges = []
-    
-    # First priority: specific date hours
-    specific_hours = None
-    for spec_date in settings.get("specific_date_hours", []):
-        if spec_date["date"] == date:
-            specific_hours = spec_date["time_ranges"]
-            break
-    
-    if specific_hours:
-        time_ranges = specific_hours
-    else:
-        # Second priority: regular weekly hours
-        for working_hours in settings.get("working_hours", []):
-            if working_hours["day_of_week"] == day_of_week:
-                time_ranges = working_hours.get("time_ranges", [])
-                break
+    if AVAILABILITY_MATERIALIZED:
+        docs = await load_availability(calendar_id, settings, target_date, target_date)
+        return availability_free_slots(docs[target_date.isoformat()])
     
-    if not time_ranges:
+    if not generate_slot_minutes(settings, target_date):
         return []
     
-    # Generate available slots
-    available_slots = []
-    appointment_duration = settings.get("appointment_duration", 60)
-    buffer_time = settings.get("buffer_time", 0)
-    
-    for time_range in time_ranges:
-        start_time = datetime.strptime(time_range["start_time"], "%H:%M").time()
-        end_time = datetime.strptime(time_range["end_time"], "%H:%M").time()
-        
-        current_time = datetime.combine(target_date, start_time)
-        end_datetime = datetime.combine(target_date, end_time)
-        
-        while current_time + timedelta(minutes=appointment_duration) <= end_datetime:
-            slot_time = current_time.strftime("%H:%M")
-            
-            # Check if slot is already booked
-            existing_appointment = await db.appointments.find_one({
-                "calendar_id": calendar_id,
-                "appointment_date": date,
-                "appointment_time": slot_time,
-                "status": {"$ne": "cancelled"}
-            })
-            
-            if not existing_appointment:
-                available_slots.append(slot_time)
-            
-            current_time += timedelta(minutes=appointment_duration + buffer_time)
-    
-    return sorted(available_slots)
+    # One query for the whole day, then an O(log n) overlap check per candidate slot
+    booked = await fetch_booked_intervals(calendar_id, settings.appointment_duration, target_date.isoformat())
+    return compute_free_slots(settings, target_date, booked.get(target_date.isoformat(), NO_BOOKINGS))
 
 # Location routes
 @api_router.get("/locations")
-async def get_locations():
+async def get_locations(request: Request):
     """Get available locations"""
-    try:
-        locations_path = Path(__file__).parent.parent / "frontend" / "src" / "data" / "locations.json"
-        with open(locations_path, 'r', encoding='utf-8') as f:
-            locations = json.load(f)
-        return locations
-    except FileNotFoundError:
-        return {"argentina": {"name": "Argentina", "provinces": {}}}
+    payload = current_locations()
+    headers = {"ETag": payload.etag, "Cache-Control": LOCATIONS_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), payload.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
+
+# Availability search routes
+@api_router.get("/availability/search")
+async def search_availability(
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    category: Optional[str] = None,
+    province: Optional[str] = None,
+    city: Optional[str] = None,
+    days: int = Query(AVAILABILITY_SEARCH_DEFAULT_DAYS, ge=1, le=AVAILABILITY_SEARCH_MAX_DAYS),
+    limit: int = Query(AVAILABILITY_SEARCH_DEFAULT_LIMIT, ge=1, le=AVAILABILITY_SEARCH_MAX_LIMIT)
+):
+    """Earliest free slots across the active calendars of a location and category.
+    
+    At most AVAILABILITY_SEARCH_MAX_CALENDARS calendars are searched, in a stable (created_at, id)
+    order; X-Calendars-Truncated: true tells the caller that more matched and the filters should narrow.
+    """
+    # Same directory filters as GET /calendars for clients
+    query = {"is_active": True, "subscription_expires": {"$gte": datetime.now(timezone.utc)}}
+    if not province and not city:
+        query["location.province"] = current_user.location.province
+        if current_user.location.city:
+            query["location.city"] = current_user.location.city
+    else:
+        if province and province != 'all':
+            query["location.province"] = province
+        if city and city != 'all':
+            query["location.city"] = city
+    if category and category != 'all':
+        query["category"] = category
+    
+    matches = await db.calendars.find(
+        query, {"_id": 0, "id": 1, "calendar_name": 1, "business_name": 1, "url_slug": 1, "category": 1}
+    ).sort([("created_at", ASCENDING), ("id", ASCENDING)]).limit(AVAILABILITY_SEARCH_MAX_CALENDARS + 1).to_list(None)
+    if len(matches) > AVAILABILITY_SEARCH_MAX_CALENDARS:
+        matches = matches[:AVAILABILITY_SEARCH_MAX_CALENDARS]
+        response.headers["X-Calendars-Truncated"] = "true"
+    calendars = {cal["id"]: cal for cal in matches}
+    if not calendars:
+        return []
+    
+    # Calendars are checked in batches, with a bounded number of batches in flight.
+    # Slots of today that already started are skipped.
+    start_date, start_minutes = local_now()
+    end_date = range_end(start_date, days)
+    calendar_ids = list(calendars)
+    semaphore = asyncio.Semaphore(AVAILABILITY_SEARCH_CONCURRENCY)
+    batches = await asyncio.gather(*(
+        earliest_slots_batch(calendar_ids[i:i + AVAILABILITY_SEARCH_BATCH_SIZE], start_date, end_date, limit, semaphore,
+                             start_minutes)
+        for i in range(0, len(calendar_ids), AVAILABILITY_SEARCH_BATCH_SIZE)
+    ))
+    
+    # Every per-calendar list is already sorted, a heap merge yields the global top-K
+    per_calendar = [slots for batch in batches for slots in batch]
+    return [
+        {
+            "calendar": calendars[calendar_id],
+            "appointment_date": date_string,
+            "appointment_time": format_minutes(minutes)
+        }
+        for date_string, minutes, calendar_id in itertools.islice(heapq.merge(*per_calendar), limit)
+    ]
 
 # Subscription plans routes
 @api_router.get("/subscription-plans", response_model=List[SubscriptionPlan])
@@ -840,6 +2564,19 @@ async def get_subscription_plans():
     plans = await db.subscription_plans.find().to_list(100)
     return [SubscriptionPlan(**plan) for plan in plans]
 
+# Metrics routes
+@api_router.get("/metrics")
+async def get_metrics(current_user: User = Depends(get_current_user)):
+    """In-process cache counters of this worker, for authenticated users only"""
+    return {
+        "caches": {name: cache.stats() for name, cache in CACHES.items()},
+        "password_pool": {
+            "workers": PASSWORD_HASH_WORKERS,
+            "queue_limit": PASSWORD_HASH_QUEUE_LIMIT,
+            **password_pool_stats
+        }
+    }
+
 # MercadoPago settings routes
 @api_router.post("/mercadopago/settings")
 async def save_mercadopago_settings(settings: MercadoPagoSettings, current_user: User = Depends(get_current_user)):
@@ -873,6 +2610,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Calendars-Truncated"],
 )
 
 logging.basicConfig(
@@ -883,4 +2621,5 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    client.close()
+    password_executor.shutdown(wait=False)
\ No newline at end of file
@@ -1,6 +1,7 @@
 import requests
 import sys
 import json
+import base64
 from datetime import datetime, timedelta, date
 import uuid
 
@@ -200,6 +201,31 @@ class TurnosProAPITester:
             self.log_test("Get Calendars (Client)", False, f"Status: {status}, Response: {response}")
             return False
 
+    def test_search_calendars(self):
+        """Test ranked calendar search, including input with regex metacharacters"""
+        for search in ('consultorio', '((a+)+)+$'):
+            success, status, response = self.make_request('GET', f'calendars?search={requests.utils.quote(search)}', token=self.client_token, expected_status=200)
+            if not success or not isinstance(response, list):
+                self.log_test("Search Calendars", False, f"Search '{search}' - Status: {status}, Response: {response}")
+                return False
+        
+        self.log_test("Search Calendars", True)
+        return True
+
+    def test_autocomplete_calendars(self):
+        """Test GET /api/calendars/autocomplete prefix suggestions"""
+        success, status, response = self.make_request('GET', 'calendars/autocomplete?q=te&province=all&city=all&limit=5', token=self.client_token, expected_status=200)
+        if not success or not isinstance(response, list) or len(response) > 5:
+            self.log_test("Autocomplete Calendars", False, f"Status: {status}, Response: {response}")
+            return False
+        
+        if any(not {'id', 'calendar_name', 'business_name', 'url_slug'} <= set(item) for item in response):
+            self.log_test("Autocomplete Calendars", False, f"Missing fields in suggestions: {response}")
+            return False
+        
+        self.log_test("Autocomplete Calendars", True, f"{len(response)} suggestions")
+        return True
+
     def test_get_calendar_by_slug(self):
         """Test getting calendar by URL slug"""
         if not self.calendar_slug:
@@ -226,6 +252,27 @@ class TurnosProAPITester:
             self.log_test("Get Locations", False, f"Status: {status}, Response: {response}")
             return False
 
+    def test_locations_conditional_get(self):
+        """Test that /api/locations sends an ETag and answers If-None-Match with 304"""
+        try:
+            response = requests.get(f"{self.base_url}/locations", timeout=10)
+            etag = response.headers.get('ETag')
+            if response.status_code != 200 or not etag:
+                self.log_test("Locations Conditional GET", False, f"Status: {response.status_code}, ETag: {etag}")
+                return False
+            
+            response = requests.get(f"{self.base_url}/locations", headers={'If-None-Match': etag}, timeout=10)
+        except requests.exceptions.RequestException as e:
+            self.log_test("Locations Conditional GET", False, str(e))
+            return False
+        
+        if response.status_code == 304 and not response.content:
+            self.log_test("Locations Conditional GET", True)
+            return True
+        else:
+            self.log_test("Locations Conditional GET", False, f"Expected 304, got {response.status_code}")
+            return False
+
     def test_create_calendar_with_free_subscription(self):
         """Test calendar creation creates free subscription automatically (NEW FEATURE)"""
         if not self.employer_token:
@@ -420,6 +467,28 @@ class TurnosProAPITester:
             self.log_test("Respond to Friendship", False, f"Status: {status}, Response: {response}")
             return False
 
+    def test_bulk_friendship_statuses(self):
+        """Test POST /api/friendships/statuses and include_friendship_status on /calendars"""
+        if not self.client_token or not self.employer_user:
+            self.log_test("Bulk Friendship Statuses", False, "Missing client token or employer user")
+            return False
+            
+        employer_id = self.employer_user['id']
+        data = {"employer_ids": [employer_id, "unknown-employer"]}
+        success, status, response = self.make_request('POST', 'friendships/statuses', data, token=self.client_token, expected_status=200)
+        
+        if not success or response.get("unknown-employer", {}).get("status") != "none" or employer_id not in response:
+            self.log_test("Bulk Friendship Statuses", False, f"Status: {status}, Response: {response}")
+            return False
+        
+        success, status, calendars = self.make_request('GET', 'calendars?province=all&include_friendship_status=true', token=self.client_token, expected_status=200)
+        if success and isinstance(calendars, list) and all(cal.get('friendship_status') for cal in calendars):
+            self.log_test("Bulk Friendship Statuses", True, "Statuses returned in bulk and inline on calendars")
+            return True
+        else:
+            self.log_test("Bulk Friendship Statuses", False, f"Status: {status}, Response: {calendars}")
+            return False
+
     def test_get_available_slots(self):
         """Test getting available slots with priority logic (NEW FEATURE)"""
         if not self.calendar_id:
@@ -475,11 +544,15 @@ class TurnosProAPITester:
             self.log_test("Create Appointment Requires Friendship", False, "Missing calendar ID or client token")
             return False
             
-        # Use tomorrow's date
+        # Book the first free slot from tomorrow on, only generated slots are accepted
         tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+        success, status, slot = self.make_request('GET', f'calendars/{self.calendar_id}/next-available?from={tomorrow}&days=30', expected_status=200)
+        if not success or not slot.get('appointment_date'):
+            self.log_test("Create Appointment Requires Friendship", False, f"No free slot - Status: {status}, Response: {slot}")
+            return False
         appointment_data = {
-            "appointment_date": tomorrow,
-            "appointment_time": "10:00",
+            "appointment_date": slot['appointment_date'],
+            "appointment_time": slot['appointment_time'],
             "notes": "Test appointment"
         }
         
@@ -499,6 +572,126 @@ class TurnosProAPITester:
                 self.log_test("Create Appointment Requires Friendship", False, f"Status: {status}, Response: {response}")
                 return False
 
+    def test_bulk_book_and_cancel_appointments(self):
+        """Test POST /api/calendars/{id}/appointments/bulk and /api/appointments/bulk-delete"""
+        if not self.calendar_id or not self.client_token:
+            self.log_test("Bulk Book and Cancel Appointments", False, "Missing calendar ID or client token")
+            return False
+            
+        # Weekly sessions at a time not used by the other tests, on the Tuesdays of the weekly hours
+        first_day = datetime.now() + timedelta(days=2)
+        first_date = (first_day + timedelta(days=(1 - first_day.weekday()) % 7)).strftime('%Y-%m-%d')
+        booking_data = {
+            "recurrence": {"start_date": first_date, "appointment_time": "16:00", "interval_days": 7, "count": 3},
+            "notes": "Weekly session",
+            "mode": "best_effort"
+        }
+        
+        success, status, response = self.make_request('POST', f'calendars/{self.calendar_id}/appointments/bulk', booking_data, token=self.client_token, expected_status=200)
+        if not success or len(response.get('results', [])) != 3:
+            self.log_test("Bulk Book and Cancel Appointments", False, f"Status: {status}, Response: {response}")
+            return False
+        
+        created_ids = [result['appointment']['id'] for result in response['results'] if result['status'] == 'created']
+        if not created_ids:
+            self.log_test("Bulk Book and Cancel Appointments", False, f"No appointment created: {response}")
+            return False
+        
+        success, status, response = self.make_request('POST', 'appointments/bulk-delete', {"appointment_ids": created_ids}, token=self.client_token, expected_status=200)
+        if success and response.get('deleted') == len(created_ids):
+            self.log_test("Bulk Book and Cancel Appointments", True, f"Booked and cancelled {len(created_ids)} sessions")
+            return True
+        else:
+            self.log_test("Bulk Book and Cancel Appointments", False, f"Status: {status}, Response: {response}")
+            return False
+
+    def test_interval_overlap_bookings(self):
+        """Test that bookings are rejected by interval overlap, not only identical start times"""
+        if not self.employer_token:
+            self.log_test("Interval Overlap Bookings", False, "No employer token available")
+            return False
+        
+        # Own calendar so the settings changes below do not affect the other tests
+        calendar_data = {
+            "calendar_name": "Overlap Calendar",
+            "business_name": "Test Business",
+            "description": "Calendar for overlap checks",
+            "url_slug": f"overlap-{uuid.uuid4().hex[:8]}",
+            "category": "medical"
+        }
+        success, status, calendar = self.make_request('POST', 'calendars', calendar_data, token=self.employer_token, expected_status=200)
+        if not success:
+            self.log_test("Interval Overlap Bookings", False, f"Calendar creation - Status: {status}, Response: {calendar}")
+            return False
+        calendar_id = calendar['id']
+        
+        def update_duration(duration):
+            settings_data = {
+                "working_hours": [
+                    {"day_of_week": day, "time_ranges": [{"start_time": "09:00", "end_time": "18:00"}]}
+                    for day in range(7)
+                ],
+                "appointment_duration": duration,
+                "buffer_time": 0
+            }
+            return self.make_request('PUT', f'calendars/{calendar_id}/settings', settings_data, token=self.employer_token, expected_status=200)[0]
+        
+        if not update_duration(60):
+            self.log_test("Interval Overlap Bookings", False, "Could not set a 60 minute duration")
+            return False
+        
+        booking_date = (datetime.now() + timedelta(days=10)).strftime('%Y-%m-%d')
+        success, status, response = self.make_request('POST', f'calendars/{calendar_id}/appointments', {"appointment_date": booking_date, "appointment_time": "10:00"}, token=self.employer_token, expected_status=200)
+        if not success:
+            self.log_test("Interval Overlap Bookings", False, f"Booking 10:00 - Status: {status}, Response: {response}")
+            return False
+        
+        # 10:30 is not one of the 60 minute slots (it would block both 10:00 and 11:00)
+        success, status, response = self.make_request('POST', f'calendars/{calendar_id}/appointments', {"appointment_date": booking_date, "appointment_time": "10:30"}, token=self.employer_token, expected_status=400)
+        if not success:
+            self.log_test("Interval Overlap Bookings", False, f"Expected 400 for an off-grid time, got {status}: {response}")
+            return False
+        
+        # The same slot twice within one bulk request: the first is booked, the second fails
+        bulk_data = {
+            "appointments": [
+                {"appointment_date": booking_date, "appointment_time": "12:00"},
+                {"appointment_date": booking_date, "appointment_time": "12:00"}
+            ],
+            "mode": "best_effort"
+        }
+        success, status, response = self.make_request('POST', f'calendars/{calendar_id}/appointments/bulk', bulk_data, token=self.employer_token, expected_status=200)
+        statuses = [result.get('status') for result in response.get('results', [])] if success else []
+        if statuses != ['created', 'failed'] or response['results'][1].get('error') != "Duplicate slot in request":
+            self.log_test("Interval Overlap Bookings", False, f"Bulk overlap - Status: {status}, Response: {response}")
+            return False
+        
+        # Shorter slots after a duration change must still avoid the existing 60 minute bookings
+        if not update_duration(30):
+            self.log_test("Interval Overlap Bookings", False, "Could not set a 30 minute duration")
+            return False
+        success, status, slots = self.make_request('GET', f'calendars/{calendar_id}/available-slots?date={booking_date}', expected_status=200)
+        if not success:
+            self.log_test("Interval Overlap Bookings", False, f"Available slots - Status: {status}, Response: {slots}")
+            return False
+        hidden = [slot for slot in ("10:00", "10:30", "12:00", "12:30") if slot in slots]
+        if hidden or "11:00" not in slots:
+            self.log_test("Interval Overlap Bookings", False, f"Slots after duration change: {slots}")
+            return False
+        
+        # 10:30 is a slot now, but it starts inside the 60 minute booking at 10:00
+        success, status, response = self.make_request('POST', f'calendars/{calendar_id}/appointments', {"appointment_date": booking_date, "appointment_time": "10:30"}, token=self.employer_token, expected_status=400)
+        if not success:
+            self.log_test("Interval Overlap Bookings", False, f"Expected 400 for a partial overlap, got {status}: {response}")
+            return False
+        success, status, response = self.make_request('POST', f'calendars/{calendar_id}/appointments', {"appointment_date": booking_date, "appointment_time": "11:00"}, token=self.employer_token, expected_status=200)
+        if not success:
+            self.log_test("Interval Overlap Bookings", False, f"Booking 11:00 - Status: {status}, Response: {response}")
+            return False
+        
+        self.log_test("Interval Overlap Bookings", True, "Off-grid times, duplicate bulk slots and partial overlaps after a duration change rejected")
+        return True
+
     def test_get_my_appointments_enhanced(self):
         """Test GET /api/appointments/my-appointments - ENHANCED FEATURE with professional info"""
         if not self.client_token:
@@ -612,6 +805,103 @@ class TurnosProAPITester:
             self.log_test("My Appointments Client Only", False, f"Expected 403, got {status}: {response}")
             return False
 
+    def test_my_appointments_pagination(self):
+        """Test limit, cursor and date-range filters on my-appointments"""
+        if not self.client_token:
+            self.log_test("My Appointments Pagination", False, "No client token available")
+            return False
+            
+        today = datetime.now().strftime('%Y-%m-%d')
+        success, status, response = self.make_request('GET', f'appointments/my-appointments?limit=1&from={today}', token=self.client_token, expected_status=200)
+        if not success or not isinstance(response, list) or len(response) > 1:
+            self.log_test("My Appointments Pagination", False, f"Status: {status}, Response: {response}")
+            return False
+        
+        if any(apt['appointment_date'] < today for apt in response):
+            self.log_test("My Appointments Pagination", False, "Date filter returned past appointments")
+            return False
+        
+        success, status, response = self.make_request('GET', 'appointments/my-appointments?cursor=invalid', token=self.client_token, expected_status=400)
+        if success:
+            self.log_test("My Appointments Pagination", True, "Limit, date filter and cursor validation work")
+            return True
+        else:
+            self.log_test("My Appointments Pagination", False, f"Expected 400 for invalid cursor, got {status}: {response}")
+            return False
+
+    def test_list_endpoints_pagination(self):
+        """Test limit and cursor validation on calendar, appointment and friendship listings"""
+        if not self.calendar_id or not self.employer_token:
+            self.log_test("List Endpoints Pagination", False, "Missing calendar ID or employer token")
+            return False
+        
+        injected_cursor = base64.urlsafe_b64encode(json.dumps([{"$exists": True}, ""]).encode()).decode()
+        
+        for endpoint in ('calendars', f'calendars/{self.calendar_id}/appointments', 'friendships/requests'):
+            success, status, response = self.make_request('GET', f'{endpoint}?limit=1', token=self.employer_token, expected_status=200)
+            if not success or not isinstance(response, list) or len(response) > 1:
+                self.log_test("List Endpoints Pagination", False, f"{endpoint} - Status: {status}, Response: {response}")
+                return False
+            
+            success, status, response = self.make_request('GET', f'{endpoint}?cursor=invalid', token=self.employer_token, expected_status=400)
+            if not success:
+                self.log_test("List Endpoints Pagination", False, f"{endpoint} - Expected 400 for invalid cursor, got {status}: {response}")
+                return False
+            
+            # Well-formed cursors carrying query operators must be rejected too
+            success, status, response = self.make_request('GET', f'{endpoint}?cursor={injected_cursor}', token=self.employer_token, expected_status=400)
+            if not success:
+                self.log_test("List Endpoints Pagination", False, f"{endpoint} - Expected 400 for operator cursor, got {status}: {response}")
+                return False
+        
+        self.log_test("List Endpoints Pagination", True, "Limit and cursor validation work on every listing")
+        return True
+
+    def test_calendar_appointments_window(self):
+        """Test from/to and status filters on GET /api/calendars/{id}/appointments"""
+        if not self.calendar_id or not self.employer_token:
+            self.log_test("Calendar Appointments Window", False, "Missing calendar ID or employer token")
+            return False
+        
+        today = datetime.now()
+        date_from = today.strftime('%Y-%m-%d')
+        date_to = (today + timedelta(days=30)).strftime('%Y-%m-%d')
+        success, status, response = self.make_request('GET', f'calendars/{self.calendar_id}/appointments?from={date_from}&to={date_to}&status=confirmed', token=self.employer_token, expected_status=200)
+        if not success or not isinstance(response, list):
+            self.log_test("Calendar Appointments Window", False, f"Status: {status}, Response: {response}")
+            return False
+        
+        if any(not (date_from <= apt['appointment_date'] <= date_to) or apt['status'] != 'confirmed' for apt in response):
+            self.log_test("Calendar Appointments Window", False, "Filters returned appointments outside the window")
+            return False
+        
+        success, status, response = self.make_request('GET', f'calendars/{self.calendar_id}/appointments?status=unknown', token=self.employer_token, expected_status=400)
+        if success:
+            self.log_test("Calendar Appointments Window", True, f"{date_from} to {date_to} window filtered correctly")
+            return True
+        else:
+            self.log_test("Calendar Appointments Window", False, f"Expected 400 for unknown status, got {status}: {response}")
+            return False
+
+    def test_export_calendar_appointments(self):
+        """Test GET /api/calendars/{id}/appointments/export in NDJSON and CSV"""
+        if not self.calendar_id or not self.employer_token:
+            self.log_test("Export Appointments", False, "Missing calendar ID or employer token")
+            return False
+        
+        success, status, response = self.make_request('GET', f'calendars/{self.calendar_id}/appointments/export?format=csv', token=self.employer_token, expected_status=200)
+        if not success or not response.get('text', '').startswith('id,calendar_id,client_id'):
+            self.log_test("Export Appointments", False, f"CSV - Status: {status}, Response: {response}")
+            return False
+        
+        success, status, response = self.make_request('GET', f'calendars/{self.calendar_id}/appointments/export?format=xml', token=self.employer_token, expected_status=400)
+        if success:
+            self.log_test("Export Appointments", True, "CSV export streams and unknown formats are rejected")
+            return True
+        else:
+            self.log_test("Export Appointments", False, f"Expected 400 for unknown format, got {status}: {response}")
+            return False
+
     def test_get_my_appointments(self):
         """Test GET /api/appointments/my-appointments - Legacy test for compatibility"""
         return self.test_get_my_appointments_enhanced()
@@ -631,6 +921,78 @@ class TurnosProAPITester:
             self.log_test("Delete Appointment", False, f"Status: {status}, Response: {response}")
             return False
 
+    def test_next_available(self):
+        """Test GET /api/calendars/{id}/next-available"""
+        if not self.calendar_id:
+            self.log_test("Next Available Slot", False, "No calendar ID available")
+            return False
+        
+        success, status, response = self.make_request('GET', f'calendars/{self.calendar_id}/next-available?days=30', expected_status=200)
+        if not success or not {'appointment_date', 'appointment_time', 'searched_until'} <= set(response):
+            self.log_test("Next Available Slot", False, f"Status: {status}, Response: {response}")
+            return False
+        
+        if response['appointment_date'] and response['appointment_date'] > response['searched_until']:
+            self.log_test("Next Available Slot", False, f"Slot beyond the horizon: {response}")
+            return False
+        
+        # Today's slots that already started must be skipped (one minute of slack for the clock)
+        now = (datetime.now() - timedelta(minutes=1)).strftime('%Y-%m-%d %H:%M')
+        if response['appointment_date'] and f"{response['appointment_date']} {response['appointment_time']}" < now:
+            self.log_test("Next Available Slot", False, f"Slot in the past: {response}")
+            return False
+        
+        self.log_test("Next Available Slot", True, f"{response['appointment_date']} {response['appointment_time']}")
+        return True
+
+    def test_search_availability(self):
+        """Test GET /api/availability/search across calendars"""
+        if not self.client_token:
+            self.log_test("Search Availability", False, "No client token available")
+            return False
+        
+        success, status, response = self.make_request('GET', 'availability/search?province=all&city=all&days=3&limit=10', token=self.client_token, expected_status=200)
+        if not success or not isinstance(response, list) or len(response) > 10:
+            self.log_test("Search Availability", False, f"Status: {status}, Response: {response}")
+            return False
+        
+        keys = [(slot['appointment_date'], slot['appointment_time']) for slot in response]
+        if keys != sorted(keys):
+            self.log_test("Search Availability", False, f"Slots are not sorted: {keys}")
+            return False
+        
+        # Today's slots that already started must be skipped (one minute of slack for the clock)
+        now = (datetime.now() - timedelta(minutes=1)).strftime('%Y-%m-%d %H:%M')
+        if keys and f"{keys[0][0]} {keys[0][1]}" < now:
+            self.log_test("Search Availability", False, f"Slot in the past: {keys[0]}")
+            return False
+        
+        self.log_test("Search Availability", True, f"{len(response)} slots")
+        return True
+
+    def test_available_slots_range(self):
+        """Test GET /api/calendars/{id}/available-slots/range for a week"""
+        if not self.calendar_id:
+            self.log_test("Available Slots Range", False, "No calendar ID available")
+            return False
+        
+        start = datetime.now() + timedelta(days=1)
+        date_from = start.strftime('%Y-%m-%d')
+        date_to = (start + timedelta(days=6)).strftime('%Y-%m-%d')
+        success, status, response = self.make_request('GET', f'calendars/{self.calendar_id}/available-slots/range?from={date_from}&to={date_to}', expected_status=200)
+        if not success or not isinstance(response, dict) or len(response) != 7:
+            self.log_test("Available Slots Range", False, f"Status: {status}, Response: {response}")
+            return False
+        
+        date_to = (start + timedelta(days=40)).strftime('%Y-%m-%d')
+        success, status, response = self.make_request('GET', f'calendars/{self.calendar_id}/available-slots/range?from={date_from}&to={date_to}', expected_status=400)
+        if success:
+            self.log_test("Available Slots Range", True, "7 days returned, spans over the cap rejected")
+            return True
+        else:
+            self.log_test("Available Slots Range", False, f"Expected 400 for a 41 day span, got {status}: {response}")
+            return False
+
     def test_get_available_dates(self):
         """Test GET /api/calendars/{id}/available-dates - NEW FEATURE"""
         if not self.calendar_id:
@@ -779,6 +1141,7 @@ class TurnosProAPITester:
         # Location tests (NEW)
         print("\n🌍 Testing Location System...")
         self.test_get_locations()
+        self.test_locations_conditional_get()
         
         # Authentication tests
         print("\n📝 Testing Authentication...")
@@ -799,6 +1162,8 @@ class TurnosProAPITester:
         self.test_create_calendar_with_free_subscription()  # NEW: Tests free subscription
         self.test_get_calendars_employer()
         self.test_get_calendars_client()
+        self.test_search_calendars()
+        self.test_autocomplete_calendars()
         self.test_calendars_filter_by_location()  # NEW
         self.test_get_calendar_by_slug()
         
@@ -812,16 +1177,22 @@ class TurnosProAPITester:
         
         # NEW: Test available dates endpoint
         self.test_get_available_dates()  # NEW FEATURE
+        self.test_next_available()
+        self.test_search_availability()
+        self.test_available_slots_range()
         
         # Friendship system tests (NEW)
         print("\n👥 Testing Friendship System...")
         self.test_request_friendship()  # NEW
         self.test_get_friendship_requests()  # NEW
         self.test_respond_to_friendship()  # NEW
+        self.test_bulk_friendship_statuses()  # Bulk status instead of per-calendar polling
         
         # Appointment tests
         print("\n🕐 Testing Appointments...")
         self.test_create_appointment_requires_friendship()  # NEW: Tests friendship requirement
+        self.test_bulk_book_and_cancel_appointments()  # Bulk booking with recurrence and bulk cancel
+        self.test_interval_overlap_bookings()  # Overlap checks beyond identical start times
         
         # Enhanced my-appointments tests (REVIEW REQUEST FOCUS)
         print("\n📋 Testing Enhanced My-Appointments Endpoint...")
@@ -829,6 +1200,10 @@ class TurnosProAPITester:
         self.test_my_appointments_client_only()  # Test client-only access
         self.test_get_my_appointments_enhanced()  # Test enhanced response with professional_info
         self.test_get_my_appointments_structure()  # Test exact response structure
+        self.test_my_appointments_pagination()  # Test cursor pagination and date filters
+        self.test_list_endpoints_pagination()  # Test cursor pagination on the other listings
+        self.test_calendar_appointments_window()  # Test from/to/status filters
+        self.test_export_calendar_appointments()  # Test streaming NDJSON/CSV export
         
         self.test_delete_appointment()  # NEW FEATURE
         self.test_get_appointments_employer()
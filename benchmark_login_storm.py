@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: latency of an unrelated endpoint while a login storm hits the API.
+
+bcrypt runs on the password hashing pool, so requests that do not authenticate with a
+password should keep their latency while logins queue up (or get a 429 once the pool
+queue is full). The probe latencies are reported at rest and during the storm.
+
+Usage: python benchmark_login_storm.py [base_url] [concurrent_logins] [duration_seconds]
+"""
+
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8001/api"
+CONCURRENT_LOGINS = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+DURATION_SECONDS = float(sys.argv[3]) if len(sys.argv) > 3 else 15
+PROBE_ENDPOINT = "subscription-plans"
+PROBE_INTERVAL_SECONDS = 0.05
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def register_user():
+    email = f"storm_{uuid.uuid4().hex[:8]}@test.com"
+    user_data = {
+        "email": email,
+        "password": "StormPass123!",
+        "full_name": "Login Storm User",
+        "user_type": "client",
+        "location": {"country": "argentina", "province": "chaco", "city": "Resistencia"}
+    }
+    response = requests.post(f"{BASE_URL}/auth/register", json=user_data, timeout=30)
+    response.raise_for_status()
+    return {"email": email, "password": "StormPass123!"}
+
+
+def probe(stop_event, latencies):
+    """Call the unrelated endpoint at a steady pace and record its latency"""
+    session = requests.Session()
+    while not stop_event.is_set():
+        started = time.perf_counter()
+        session.get(f"{BASE_URL}/{PROBE_ENDPOINT}", timeout=30)
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(PROBE_INTERVAL_SECONDS)
+
+
+def login_loop(credentials, stop_event, outcomes, lock):
+    session = requests.Session()
+    while not stop_event.is_set():
+        response = session.post(f"{BASE_URL}/auth/login", json=credentials, timeout=60)
+        with lock:
+            outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+
+
+def measure_probe(seconds, storm_credentials=None):
+    stop_event = threading.Event()
+    latencies = []
+    outcomes = {}
+    lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=CONCURRENT_LOGINS + 1) as executor:
+        executor.submit(probe, stop_event, latencies)
+        if storm_credentials:
+            for _ in range(CONCURRENT_LOGINS):
+                executor.submit(login_loop, storm_credentials, stop_event, outcomes, lock)
+        time.sleep(seconds)
+        stop_event.set()
+    return latencies, outcomes
+
+
+def report(name, latencies):
+    print(f"{name:>14} | {len(latencies):>6} | {statistics.median(latencies):>9.1f} | "
+          f"{percentile(latencies, 95):>8.1f} | {percentile(latencies, 99):>8.1f}")
+
+
+def main():
+    print(f"🌩️  Login storm benchmark against {BASE_URL}")
+    print(f"   {CONCURRENT_LOGINS} concurrent logins for {DURATION_SECONDS}s, probing GET /{PROBE_ENDPOINT}")
+    credentials = register_user()
+
+    baseline, _ = measure_probe(DURATION_SECONDS / 3)
+    storm, outcomes = measure_probe(DURATION_SECONDS, credentials)
+
+    print("=" * 60)
+    print(f"{'phase':>14} | {'probes':>6} | {'median ms':>9} | {'p95 ms':>8} | {'p99 ms':>8}")
+    print("-" * 60)
+    report("at rest", baseline)
+    report("login storm", storm)
+    print("=" * 60)
+    print(f"Login responses by status: {dict(sorted(outcomes.items()))}")
+    token = requests.post(f"{BASE_URL}/auth/login", json=credentials, timeout=60).json()["access_token"]
+    metrics = requests.get(f"{BASE_URL}/metrics", headers={"Authorization": f"Bearer {token}"}, timeout=10).json()
+    print(f"Password pool: {metrics.get('password_pool')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
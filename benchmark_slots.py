@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark for GET /api/calendars/{id}/available-slots against a mocked Motor database.
+
+Every database call sleeps for a simulated round trip so the numbers reflect how many
+queries a request issues. The legacy strategy (one find_one per candidate slot) is kept
+here as a reference to compare against the single-query slot engine in server.py.
+
+Usage: python benchmark_slots.py [round_trip_ms]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import server  # noqa: E402
+
+ROUND_TRIP_MS = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+ITERATIONS = 20
+BOOKINGS_PER_DAY = [1, 10, 100]
+
+
+def matches(doc, query):
+    """Minimal subset of the MongoDB query language used by the slot endpoints"""
+    for key, condition in query.items():
+        value = doc
+        for part in key.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        if isinstance(condition, dict):
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class MockCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(ROUND_TRIP_MS / 1000)
+        return self.docs[:length] if length else list(self.docs)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in await self.to_list():
+            yield doc
+
+
+class MockCollection:
+    def __init__(self):
+        self.docs = []
+        self.queries = 0
+
+    async def find_one(self, query, projection=None):
+        self.queries += 1
+        await asyncio.sleep(ROUND_TRIP_MS / 1000)
+        return next((dict(doc) for doc in self.docs if matches(doc, query)), None)
+
+    def find(self, query=None, projection=None):
+        self.queries += 1
+        return MockCursor([dict(doc) for doc in self.docs if matches(doc, query or {})])
+
+
+class MockDatabase:
+    def __init__(self):
+        self.calendars = MockCollection()
+        self.calendar_settings = MockCollection()
+        self.appointments = MockCollection()
+
+    def reset_counters(self):
+        for collection in (self.calendars, self.calendar_settings, self.appointments):
+            collection.queries = 0
+
+    @property
+    def queries(self):
+        return self.calendars.queries + self.calendar_settings.queries + self.appointments.queries
+
+
+async def legacy_available_slots(calendar_id, date_string):
+    """Reference implementation: one find_one per candidate slot"""
+    db = server.db
+    await db.calendars.find_one({"id": calendar_id, "is_active": True})
+    settings = await db.calendar_settings.find_one({"calendar_id": calendar_id})
+    target_date = datetime.fromisoformat(date_string).date()
+    available = []
+    for slot_time in server.generate_slot_times(server.load_schedule(settings), target_date):
+        existing = await db.appointments.find_one({
+            "calendar_id": calendar_id,
+            "appointment_date": date_string,
+            "appointment_time": slot_time,
+            "status": {"$ne": "cancelled"}
+        })
+        if not existing:
+            available.append(slot_time)
+    return sorted(available)
+
+
+def build_database(bookings_per_day):
+    """10-hour day with 15-minute slots (40 candidates) and the given number of bookings"""
+    db = MockDatabase()
+    calendar_id = str(uuid.uuid4())
+    target_date = (date.today() + timedelta(days=7)).isoformat()
+    db.calendars.docs.append({"id": calendar_id, "is_active": True})
+    db.calendar_settings.docs.append({
+        "calendar_id": calendar_id,
+        "working_hours": [
+            {"day_of_week": day, "time_ranges": [{"start_time": "08:00", "end_time": "18:00"}]}
+            for day in range(7)
+        ],
+        "appointment_duration": 15,
+        "buffer_time": 0
+    })
+    for i in range(bookings_per_day):
+        minutes = 8 * 60 + (i * 15) % (10 * 60)
+        db.appointments.docs.append({
+            "id": str(uuid.uuid4()),
+            "calendar_id": calendar_id,
+            "appointment_date": target_date,
+            "appointment_time": f"{minutes // 60:02d}:{minutes % 60:02d}",
+            "status": "cancelled" if i >= 40 else "confirmed"
+        })
+    return db, calendar_id, target_date
+
+
+async def measure(handler, calendar_id, target_date):
+    latencies = []
+    result = None
+    for _ in range(ITERATIONS):
+        server.db.reset_counters()
+        started = time.perf_counter()
+        result = await handler(calendar_id, target_date)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return result, latencies, server.db.queries
+
+
+async def main():
+    print(f"⏱️  Available slots benchmark ({ROUND_TRIP_MS} ms simulated round trip, {ITERATIONS} runs)")
+    print("=" * 78)
+    print(f"{'bookings/day':>12} | {'strategy':>10} | {'queries':>7} | {'median ms':>9} | {'p95 ms':>8} | {'free':>4}")
+    print("-" * 78)
+    for bookings in BOOKINGS_PER_DAY:
+        server.db, calendar_id, target_date = build_database(bookings)
+        legacy, legacy_latencies, legacy_queries = await measure(legacy_available_slots, calendar_id, target_date)
+        engine, engine_latencies, engine_queries = await measure(server.get_available_slots, calendar_id, target_date)
+        if legacy != engine:
+            print(f"❌ Results differ for {bookings} bookings: {legacy} != {engine}")
+            return 1
+        for name, latencies, queries, slots in (
+            ("legacy", legacy_latencies, legacy_queries, legacy),
+            ("engine", engine_latencies, engine_queries, engine),
+        ):
+            p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1]
+            print(f"{bookings:>12} | {name:>10} | {queries:>7} | {statistics.median(latencies):>9.2f} | {p95:>8.2f} | {len(slots):>4}")
+    print("=" * 78)
+    print("✅ Both strategies return identical slots")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for POST /api/calendars/{id}/appointments.
+
+Fires hundreds of simultaneous bookings for the same slot from several accepted clients
+and asserts that exactly one succeeds while every other request gets
+400 "Time slot not available".
+
+Usage: python booking_stress_test.py [base_url] [concurrent_bookings]
+"""
+
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 else "https://appt-view-enhance.preview.emergentagent.com/api"
+CONCURRENT_BOOKINGS = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+CLIENTS = 10
+LOCATION = {"country": "argentina", "province": "chaco", "city": "Resistencia"}
+
+
+def register_and_login(user_type, full_name):
+    email = f"stress_{user_type}_{uuid.uuid4().hex[:8]}@test.com"
+    user_data = {
+        "email": email,
+        "password": "StressPass123!",
+        "full_name": full_name,
+        "user_type": user_type,
+        "location": LOCATION
+    }
+    response = requests.post(f"{BASE_URL}/auth/register", json=user_data, timeout=30)
+    response.raise_for_status()
+    user = response.json()
+    response = requests.post(f"{BASE_URL}/auth/login", json={"email": email, "password": "StressPass123!"}, timeout=30)
+    response.raise_for_status()
+    return user, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def setup_calendar():
+    """Employer with an open calendar and CLIENTS accepted clients"""
+    employer, employer_headers = register_and_login("employer", "Stress Employer")
+    calendar_data = {
+        "calendar_name": "Stress Test",
+        "business_name": "Stress Test",
+        "description": "Concurrency stress test",
+        "url_slug": f"stress-{uuid.uuid4().hex[:8]}"
+    }
+    response = requests.post(f"{BASE_URL}/calendars", json=calendar_data, headers=employer_headers, timeout=30)
+    response.raise_for_status()
+    calendar = response.json()
+
+    settings = {
+        "working_hours": [
+            {"day_of_week": day, "time_ranges": [{"start_time": "09:00", "end_time": "18:00"}]}
+            for day in range(7)
+        ],
+        "appointment_duration": 30
+    }
+    response = requests.put(f"{BASE_URL}/calendars/{calendar['id']}/settings", json=settings, headers=employer_headers, timeout=30)
+    response.raise_for_status()
+
+    client_headers = []
+    for i in range(CLIENTS):
+        _, headers = register_and_login("client", f"Stress Client {i}")
+        requests.post(f"{BASE_URL}/friendships/request", json={"employer_id": employer["id"]}, headers=headers, timeout=30).raise_for_status()
+        client_headers.append(headers)
+
+    pending = requests.get(f"{BASE_URL}/friendships/requests", headers=employer_headers, timeout=30).json()
+    for request in pending:
+        requests.post(f"{BASE_URL}/friendships/{request['id']}/respond", json={"accept": True}, headers=employer_headers, timeout=30).raise_for_status()
+
+    return calendar, client_headers
+
+
+def main():
+    print(f"🔥 Booking stress test against {BASE_URL}: {CONCURRENT_BOOKINGS} simultaneous bookings")
+    calendar, client_headers = setup_calendar()
+    appointment = {
+        "appointment_date": (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d'),
+        "appointment_time": "10:00"
+    }
+    url = f"{BASE_URL}/calendars/{calendar['id']}/appointments"
+
+    start = threading.Barrier(CONCURRENT_BOOKINGS)
+
+    def book(index):
+        start.wait()
+        response = requests.post(url, json=appointment, headers=client_headers[index % CLIENTS], timeout=60)
+        return response.status_code, response.json() if response.content else {}
+
+    with ThreadPoolExecutor(max_workers=CONCURRENT_BOOKINGS) as executor:
+        results = list(executor.map(book, range(CONCURRENT_BOOKINGS)))
+
+    successes = [body for code, body in results if code == 200]
+    rejected = [body for code, body in results if code == 400 and body.get("detail") == "Time slot not available"]
+    unexpected = [(code, body) for code, body in results if code not in (200, 400)]
+
+    print(f"   200 OK: {len(successes)}, 400 slot taken: {len(rejected)}, other: {len(unexpected)}")
+    if unexpected:
+        print(f"   Unexpected responses: {unexpected[:5]}")
+
+    if len(successes) == 1 and len(rejected) == CONCURRENT_BOOKINGS - 1:
+        print("✅ Exactly one booking succeeded")
+        return 0
+    print(f"❌ Expected exactly one success, got {len(successes)}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -70,7 +70,18 @@ def create_calendar_and_appointment(employer_user, client_user, employer_token,
     print(f"Calendar creation: {response.status_code}")
     calendar = response.json()
     calendar_id = calendar["id"]
-    
+
+    # Open every day so the appointment below is on a generated slot
+    settings_data = {
+        "working_hours": [
+            {"day_of_week": day, "time_ranges": [{"start_time": "09:00", "end_time": "18:00"}]}
+            for day in range(7)
+        ],
+        "appointment_duration": 30
+    }
+    response = requests.put(f"{base_url}/calendars/{calendar_id}/settings", json=settings_data, headers=headers)
+    print(f"Calendar settings: {response.status_code}")
+
     # Request friendship
     friendship_data = {"employer_id": employer_user["id"]}
     headers = {'Authorization': f'Bearer {client_token}', 'Content-Type': 'application/json'}
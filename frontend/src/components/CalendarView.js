@@ -20,7 +20,9 @@ import {
   Save,
   Eye,
   CreditCard,
-  CalendarDays
+  CalendarDays,
+  ChevronLeft,
+  ChevronRight
 } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -34,6 +36,10 @@ const CalendarView = () => {
   const [calendar, setCalendar] = useState(null);
   const [settings, setSettings] = useState(null);
   const [appointments, setAppointments] = useState([]);
+  const [appointmentsMonth, setAppointmentsMonth] = useState(() => {
+    const now = new Date();
+    return new Date(now.getFullYear(), now.getMonth(), 1);
+  });
   const [loading, setLoading] = useState(true);
   const [saving, setSaving] = useState(false);
 
@@ -43,12 +49,35 @@ const CalendarView = () => {
     loadCalendarData();
   }, [calendarId]);
 
+  const formatDate = (date) => {
+    return `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}-${String(date.getDate()).padStart(2, '0')}`;
+  };
+
+  // Only request the appointments of the visible month
+  const fetchAppointments = (month) => {
+    const monthEnd = new Date(month.getFullYear(), month.getMonth() + 1, 0);
+    return axios.get(`${API}/calendars/${calendarId}/appointments`, {
+      params: { from: formatDate(month), to: formatDate(monthEnd) }
+    });
+  };
+
+  const changeAppointmentsMonth = async (delta) => {
+    const month = new Date(appointmentsMonth.getFullYear(), appointmentsMonth.getMonth() + delta, 1);
+    setAppointmentsMonth(month);
+    try {
+      const response = await fetchAppointments(month);
+      setAppointments(response.data);
+    } catch (error) {
+      console.error('Error loading appointments:', error);
+    }
+  };
+
   const loadCalendarData = async () => {
     try {
       const [calendarRes, settingsRes, appointmentsRes] = await Promise.all([
         axios.get(`${API}/calendars`).then(res => res.data.find(cal => cal.id === calendarId)),
         axios.get(`${API}/calendars/${calendarId}/settings`),
-        axios.get(`${API}/calendars/${calendarId}/appointments`)
+        fetchAppointments(appointmentsMonth)
       ]);
 
       if (!calendarRes) {
@@ -626,10 +655,25 @@ const CalendarView = () => {
           <TabsContent value="appointments">
             <Card>
               <CardHeader>
-                <CardTitle>Turnos Programados</CardTitle>
-                <CardDescription>
-                  Gestiona todos los turnos de tu calendario
-                </CardDescription>
+                <div className="flex items-center justify-between">
+                  <div>
+                    <CardTitle>Turnos Programados</CardTitle>
+                    <CardDescription>
+                      Gestiona todos los turnos de tu calendario
+                    </CardDescription>
+                  </div>
+                  <div className="flex items-center space-x-2">
+                    <Button size="sm" variant="outline" onClick={() => changeAppointmentsMonth(-1)}>
+                      <ChevronLeft className="w-4 h-4" />
+                    </Button>
+                    <span className="text-sm font-medium text-gray-700 capitalize">
+                      {appointmentsMonth.toLocaleDateString('es-AR', { month: 'long', year: 'numeric' })}
+                    </span>
+                    <Button size="sm" variant="outline" onClick={() => changeAppointmentsMonth(1)}>
+                      <ChevronRight className="w-4 h-4" />
+                    </Button>
+                  </div>
+                </div>
               </CardHeader>
               <CardContent>
                 {appointments.length === 0 ? (
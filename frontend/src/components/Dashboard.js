@@ -46,6 +46,8 @@ const Dashboard = () => {
   const [loading, setLoading] = useState(true);
   const [showCreateForm, setShowCreateForm] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
+  const [searchInput, setSearchInput] = useState('');
+  const [searchSuggestions, setSearchSuggestions] = useState([]);
   const [selectedProvince, setSelectedProvince] = useState(user?.location?.province || '');
   const [selectedCity, setSelectedCity] = useState(user?.location?.city || 'all');
   const [selectedCategory, setSelectedCategory] = useState('all');
@@ -90,6 +92,14 @@ const Dashboard = () => {
     }
   }, [searchTerm, selectedProvince, selectedCity, selectedCategory]);
 
+  // Typeahead suggestions on every keystroke, the full search only once typing pauses
+  useEffect(() => {
+    if (user?.user_type !== 'client') return;
+    loadSearchSuggestions(searchInput);
+    const timer = setTimeout(() => setSearchTerm(searchInput), 300);
+    return () => clearTimeout(timer);
+  }, [searchInput]);
+
   const loadDashboardData = async () => {
     try {
       const [calendarsRes, plansRes] = await Promise.all([
@@ -105,6 +115,23 @@ const Dashboard = () => {
     }
   };
 
+  const loadSearchSuggestions = async (text) => {
+    if (text.trim().length < 2) {
+      setSearchSuggestions([]);
+      return;
+    }
+    try {
+      const params = { q: text };
+      if (selectedProvince) params.province = selectedProvince;
+      if (selectedCity) params.city = selectedCity;
+      if (selectedCategory) params.category = selectedCategory;
+      const response = await axios.get(`${API}/calendars/autocomplete`, { params });
+      setSearchSuggestions(response.data);
+    } catch (error) {
+      console.error('Error loading search suggestions:', error);
+    }
+  };
+
   const loadCalendars = async () => {
     try {
       const params = new URLSearchParams();
@@ -112,20 +139,16 @@ const Dashboard = () => {
       if (selectedProvince && selectedProvince !== 'all') params.append('province', selectedProvince);
       if (selectedCity && selectedCity !== 'all') params.append('city', selectedCity);
       if (selectedCategory && selectedCategory !== 'all') params.append('category', selectedCategory);
+      if (user?.user_type === 'client') params.append('include_friendship_status', 'true');
 
       const response = await axios.get(`${API}/calendars?${params.toString()}`);
       setCalendars(response.data);
       
-      // Load friendship statuses for these calendars
+      // Friendship statuses come annotated on each calendar
       if (user?.user_type === 'client') {
         const statuses = {};
         for (const calendar of response.data) {
-          try {
-            const statusRes = await axios.get(`${API}/friendships/status/${calendar.employer_id}`);
-            statuses[calendar.employer_id] = statusRes.data;
-          } catch (error) {
-            statuses[calendar.employer_id] = { status: 'none', can_request: true };
-          }
+          statuses[calendar.employer_id] = calendar.friendship_status || { status: 'none', can_request: true };
         }
         setFriendshipStatuses(statuses);
       }
@@ -794,9 +817,18 @@ const Dashboard = () => {
                         <Input
                           id="search"
                           placeholder="Nombre, servicio..."
-                          value={searchTerm}
-                          onChange={(e) => setSearchTerm(e.target.value)}
+                          value={searchInput}
+                          onChange={(e) => setSearchInput(e.target.value)}
+                          list="search-suggestions"
+                          autoComplete="off"
                         />
+                        <datalist id="search-suggestions">
+                          {searchSuggestions.map((suggestion) => (
+                            <option key={suggestion.id} value={suggestion.calendar_name}>
+                              {suggestion.business_name}
+                            </option>
+                          ))}
+                        </datalist>
                       </div>
                       
                       <div>
@@ -13,6 +13,8 @@ import { Calendar as CalendarIcon, Clock, User, MapPin, CheckCircle2, UserPlus,
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+// Week fetches only save the per-day requests of one browsing pass, older entries are refetched
+const SLOTS_CACHE_TTL_MS = 60 * 1000;
 
 const PublicCalendar = () => {
   const { urlSlug } = useParams();
@@ -24,6 +26,7 @@ const PublicCalendar = () => {
   const [selectedDate, setSelectedDate] = useState(null);
   const [selectedTime, setSelectedTime] = useState(null);
   const [availableSlots, setAvailableSlots] = useState([]);
+  const [slotsCache, setSlotsCache] = useState({}); // date -> { slots, fetchedAt }, filled a week at a time
   const [dateStates, setDateStates] = useState({});
   const [loading, setLoading] = useState(true);
   const [bookingStep, setBookingStep] = useState('calendar'); // 'calendar', 'login', 'friendship', 'booking', 'success'
@@ -103,10 +106,26 @@ const PublicCalendar = () => {
     }
   };
 
-  const loadAvailableSlots = async (date) => {
+  const loadAvailableSlots = async (date, { fresh = false } = {}) => {
+    const cached = slotsCache[date];
+    if (!fresh && cached && Date.now() - cached.fetchedAt < SLOTS_CACHE_TTL_MS) {
+      setAvailableSlots(cached.slots);
+      return;
+    }
     try {
-      const response = await axios.get(`${API}/calendars/${calendar.id}/available-slots?date=${date}`);
-      setAvailableSlots(response.data);
+      // Fetch the whole week starting at the selected date in one request
+      const weekEnd = new Date(date);
+      weekEnd.setUTCDate(weekEnd.getUTCDate() + 6);
+      const response = await axios.get(`${API}/calendars/${calendar.id}/available-slots/range`, {
+        params: { from: date, to: weekEnd.toISOString().split('T')[0] }
+      });
+      const fetchedAt = Date.now();
+      const week = {};
+      Object.entries(response.data).forEach(([day, slots]) => {
+        week[day] = { slots, fetchedAt };
+      });
+      setSlotsCache(prev => ({ ...(fresh ? {} : prev), ...week }));
+      setAvailableSlots(response.data[date] || []);
     } catch (error) {
       console.error('Error loading available slots:', error);
       setAvailableSlots([]);
@@ -216,6 +235,7 @@ const PublicCalendar = () => {
       };
 
       await axios.post(`${API}/calendars/${calendar.id}/appointments`, appointmentData);
+      setSlotsCache({});
       setBookingStep('success');
     } catch (error) {
       console.error('Error booking appointment:', error);
@@ -223,6 +243,10 @@ const PublicCalendar = () => {
         setBookingStep('friendship');
       } else {
         alert('Error al reservar el turno: ' + (error.response?.data?.detail || 'Error desconocido'));
+        // The cached slots are out of date (e.g. the slot was just taken), refetch them
+        setSelectedTime(null);
+        setBookingStep('calendar');
+        loadAvailableSlots(selectedDate.toISOString().split('T')[0], { fresh: true });
       }
     }
   };
@@ -130,6 +130,18 @@ class EnhancedAppointmentsTest:
             raise Exception(f"Failed to create calendar: {status} - {response}")
         calendar_id = response['id']
         
+        # Open every day so the appointments below are on generated slots
+        settings_data = {
+            "working_hours": [
+                {"day_of_week": day, "time_ranges": [{"start_time": "09:00", "end_time": "18:00"}]}
+                for day in range(7)
+            ],
+            "appointment_duration": 30
+        }
+        success, status, response = self.make_request('PUT', f'calendars/{calendar_id}/settings', settings_data, token=employer_token)
+        if not success:
+            raise Exception(f"Failed to update calendar settings: {status} - {response}")
+        
         # Create friendship
         success, status, response = self.make_request('POST', 'friendships/request', 
                                                     {"employer_id": employer_user["id"]}, token=client_token)
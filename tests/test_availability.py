@@ -0,0 +1,153 @@
+"""
+Materialized per-day availability, run against mongomock:
+
+    pip install -r backend/requirements.txt
+    python -m pytest tests/test_availability.py
+"""
+
+import asyncio
+import os
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "availability_test")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+CALENDAR_ID = "calendar-1"
+SETTINGS = {
+    "calendar_id": CALENDAR_ID,
+    "working_hours": [
+        {"day_of_week": day, "time_ranges": [{"start_time": "09:00", "end_time": "11:00"}]} for day in range(7)
+    ],
+    "appointment_duration": 30,
+    "buffer_time": 0,
+    "revision": 0,
+}
+TOMORROW = date.today() + timedelta(days=1)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Fresh mock database with the availability unique index and materialization turned on"""
+    monkeypatch.setattr(server, "db", mongomock_motor.AsyncMongoMockClient()["availability_test"])
+    monkeypatch.setattr(server, "settings_cache", server.TTLCache(10, 300))
+    monkeypatch.setattr(server, "settings_store", None)
+    monkeypatch.setattr(server, "AVAILABILITY_MATERIALIZED", 1)
+
+    async def setup():
+        for keys, options in server.MONGO_INDEXES["availability"]:
+            await server.db.availability.create_index(keys, **options)
+        await server.db.calendar_settings.insert_one(dict(SETTINGS))
+
+    asyncio.run(setup())
+    return server
+
+
+async def book(backend, target_date: date, time: str):
+    await backend.db.appointments.insert_one({
+        "id": f"{target_date}-{time}", "calendar_id": CALENDAR_ID, "appointment_date": target_date.isoformat(),
+        "appointment_time": time, "status": "confirmed", "duration": 30
+    })
+    await backend.mark_availability_changed(CALENDAR_ID, target_date.isoformat())
+
+
+async def stored_doc(backend, target_date: date):
+    return await backend.db.availability.find_one({"calendar_id": CALENDAR_ID, "date": target_date.isoformat()})
+
+
+def test_bitmap_round_trip(backend):
+    for flags in ([], [True], [False] * 8, [True, False, True] * 5, [i % 7 == 0 for i in range(70)]):
+        assert backend.decode_bitmap(backend.encode_bitmap(flags), len(flags)) == flags
+
+
+def test_booking_marks_day_stale_and_next_read_rebuilds(backend):
+    async def scenario():
+        schedule = await backend.load_calendar_settings(CALENDAR_ID)
+        docs = await backend.load_availability(CALENDAR_ID, schedule, TOMORROW, TOMORROW)
+        assert docs[TOMORROW.isoformat()]["free_count"] == 4
+
+        await book(backend, TOMORROW, "09:30")
+        doc = await stored_doc(backend, TOMORROW)
+        assert doc["stale"] and doc["changes"] == 1
+
+        docs = await backend.load_availability(CALENDAR_ID, schedule, TOMORROW, TOMORROW)
+        assert backend.availability_free_slots(docs[TOMORROW.isoformat()]) == ["09:00", "10:00", "10:30"]
+        doc = await stored_doc(backend, TOMORROW)
+        assert not doc.get("stale") and doc["changes"] == 1 and doc["free_count"] == 3
+
+        # Deleting the appointment marks the day again
+        await backend.db.appointments.delete_many({})
+        await backend.mark_availability_changed(CALENDAR_ID, TOMORROW.isoformat())
+        docs = await backend.load_availability(CALENDAR_ID, schedule, TOMORROW, TOMORROW)
+        assert docs[TOMORROW.isoformat()]["free_count"] == 4
+        assert (await stored_doc(backend, TOMORROW))["changes"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_rebuild_is_dropped_when_the_counter_moves(backend, monkeypatch):
+    async def scenario():
+        schedule = await backend.load_calendar_settings(CALENDAR_ID)
+        await book(backend, TOMORROW, "09:00")
+        fetch_booked_intervals = backend.fetch_booked_intervals
+
+        async def booking_in_between(*args, **kwargs):
+            # Read the bookings, then let another request book before the rebuild is written
+            booked = await fetch_booked_intervals(*args, **kwargs)
+            await book(backend, TOMORROW, "10:00")
+            return booked
+
+        monkeypatch.setattr(backend, "fetch_booked_intervals", booking_in_between)
+        docs = await backend.materialize_availability(CALENDAR_ID, schedule, TOMORROW, TOMORROW)
+        assert docs[TOMORROW.isoformat()]["free_count"] == 3
+        doc = await stored_doc(backend, TOMORROW)
+        assert doc["stale"] and doc["changes"] == 2
+
+        monkeypatch.setattr(backend, "fetch_booked_intervals", fetch_booked_intervals)
+        docs = await backend.load_availability(CALENDAR_ID, schedule, TOMORROW, TOMORROW)
+        assert backend.availability_free_slots(docs[TOMORROW.isoformat()]) == ["09:30", "10:30"]
+
+    asyncio.run(scenario())
+
+
+def test_newer_settings_revision_reloads_settings(backend):
+    async def scenario():
+        outdated = await backend.load_calendar_settings(CALENDAR_ID)
+        # Another worker updated the settings and materialized the day with them
+        await backend.db.calendar_settings.update_one(
+            {"calendar_id": CALENDAR_ID}, {"$set": {"appointment_duration": 60}, "$inc": {"revision": 1}}
+        )
+        current = backend.load_schedule(await backend.db.calendar_settings.find_one({"calendar_id": CALENDAR_ID}))
+        await backend.materialize_availability(CALENDAR_ID, current, TOMORROW, TOMORROW)
+
+        docs = await backend.load_availability(CALENDAR_ID, outdated, TOMORROW, TOMORROW)
+        assert backend.availability_free_slots(docs[TOMORROW.isoformat()]) == ["09:00", "10:00"]
+        assert (await backend.load_calendar_settings(CALENDAR_ID)).revision == 1
+        assert (await stored_doc(backend, TOMORROW))["settings_revision"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_days_outside_the_window_are_not_stored(backend):
+    async def scenario():
+        schedule = await backend.load_calendar_settings(CALENDAR_ID)
+        yesterday = date.today() - timedelta(days=1)
+        beyond = date.today() + timedelta(days=backend.AVAILABILITY_WINDOW_DAYS)
+        docs = await backend.load_availability(CALENDAR_ID, schedule, yesterday, TOMORROW)
+        assert set(docs) == {yesterday.isoformat(), date.today().isoformat(), TOMORROW.isoformat()}
+        await backend.load_availability(CALENDAR_ID, schedule, beyond, beyond + timedelta(days=2))
+
+        await book(backend, yesterday, "09:00")
+        await book(backend, beyond, "09:00")
+        stored = {doc["date"] async for doc in backend.db.availability.find({"calendar_id": CALENDAR_ID})}
+        assert stored == {date.today().isoformat(), TOMORROW.isoformat()}
+
+    asyncio.run(scenario())
@@ -0,0 +1,80 @@
+"""
+Redis-backed calendar settings cache, run against fakeredis and mongomock:
+
+    pip install -r backend/requirements.txt
+    python -m pytest tests/test_settings_cache.py
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+from redis.exceptions import RedisError  # noqa: E402  (installed with fakeredis)
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "settings_cache_test")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+CALENDAR_ID = "calendar-1"
+SETTINGS = {
+    "calendar_id": CALENDAR_ID,
+    "working_hours": [{"day_of_week": 0, "time_ranges": [{"start_time": "09:00", "end_time": "12:00"}]}],
+    "appointment_duration": 30,
+    "buffer_time": 0,
+}
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Fresh mock database and an empty in-process cache for every test"""
+    monkeypatch.setattr(server, "db", mongomock_motor.AsyncMongoMockClient()["settings_cache_test"])
+    monkeypatch.setattr(server, "settings_cache", server.TTLCache(10, 300))
+    asyncio.run(server.db.calendar_settings.insert_one(dict(SETTINGS)))
+    return server
+
+
+def use_redis(backend, monkeypatch, fake_server):
+    redis_client = fakeredis.aioredis.FakeRedis(server=fake_server)
+    store = backend.RedisSettingsStore(redis_client, 300, errors=(RedisError, OSError))
+    monkeypatch.setattr(backend, "settings_store", store)
+    return redis_client
+
+
+def test_settings_are_shared_through_redis(backend, monkeypatch):
+    fake_server = fakeredis.FakeServer()
+    redis_client = use_redis(backend, monkeypatch, fake_server)
+
+    async def scenario():
+        schedule = await backend.load_calendar_settings(CALENDAR_ID)
+        assert schedule.appointment_duration == 30
+        assert await redis_client.get(backend.RedisSettingsStore.key(CALENDAR_ID)) is not None
+
+        # Served from Redis once cached, without reading MongoDB
+        await backend.db.calendar_settings.delete_many({})
+        cached = await backend.load_calendar_settings(CALENDAR_ID)
+        assert cached.weekly[0] == ((540, 720),)
+
+    asyncio.run(scenario())
+
+
+def test_redis_outage_falls_back_to_mongo(backend, monkeypatch):
+    fake_server = fakeredis.FakeServer()
+    use_redis(backend, monkeypatch, fake_server)
+    fake_server.connected = False
+
+    async def scenario():
+        schedule = await backend.load_calendar_settings(CALENDAR_ID)
+        assert schedule is not None
+        assert schedule.appointment_duration == 30
+
+        # Write-through during an outage is skipped, not raised
+        await backend.cache_calendar_settings(CALENDAR_ID, dict(SETTINGS, appointment_duration=45))
+
+    asyncio.run(scenario())